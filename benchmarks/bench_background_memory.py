@@ -0,0 +1,117 @@
+"""背景更新的内存开销对比
+
+原图先用 LANCZOS 缩放到刚好覆盖窗口的大小（不计入测量），再对同一张缩放后的
+图像比较两条转换路径的峰值内存和耗时：
+- legacy：原实现（转换 RGBA、putalpha、tobytes、QImage Format_RGBA8888、QPixmap）
+- bridge：image_bridge.pil_to_qimage 一次导出为 Qt 原生格式，再转为 QPixmap
+
+tracemalloc 统计 Python 层分配的峰值（tobytes 产生的字节串等），除以缩放后图像
+的大小，近似得到每次更新产生的整图副本数。安装了 psutil 时另外给出更新期间
+进程常驻内存的最大增量，其中包括 Pillow 和 Qt 自己分配的像素数据。
+
+用法：
+    python benchmarks/bench_background_memory.py [--source 6000x4000] [--window 800x1200] [--mode RGB]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import psutil
+except ImportError:  # psutil 是可选依赖
+    psutil = None
+
+
+def _make_image(size, mode):
+    from PIL import Image
+    image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    return image if mode == 'RGB' else image.convert(mode)
+
+
+def _legacy(background):
+    from PySide2.QtGui import QImage, QPixmap
+    background = background.convert('RGBA')
+    background.putalpha(int(255 * 0.8))
+    img_data = background.tobytes('raw', 'RGBA')
+    qimage = QImage(img_data, background.width, background.height, QImage.Format.Format_RGBA8888)
+    return QPixmap.fromImage(qimage)
+
+
+def _bridge(background):
+    from PySide2.QtGui import QPixmap
+    from modules.image_bridge import pil_to_qimage
+    return QPixmap.fromImage(pil_to_qimage(background))
+
+
+PATHS = {
+    'legacy': _legacy,
+    'bridge': _bridge,
+}
+
+
+def _rss():
+    """当前进程的常驻内存（字节），没有 psutil 时返回 None"""
+    return psutil.Process().memory_info().rss if psutil is not None else None
+
+
+def measure(update, background, repeat):
+    """返回 (Python 层峰值字节数, 常驻内存最大增量或 None, 每次耗时秒数)"""
+    gc.collect()
+    baseline_rss = _rss()
+    rss_peak = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        pixmap = update(background)
+        if baseline_rss is not None:
+            rss_peak = max(rss_peak, _rss() - baseline_rss)
+        del pixmap
+    elapsed = (time.perf_counter() - start) / repeat
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, rss_peak if baseline_rss is not None else None, elapsed
+
+
+def _parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="背景更新的内存开销对比")
+    parser.add_argument('--source', type=_parse_size, default=(6000, 4000), help="原图尺寸")
+    parser.add_argument('--window', type=_parse_size, default=(800, 1200), help="窗口尺寸")
+    parser.add_argument('--mode', default='RGB', choices=['RGB', 'RGBA'], help="原图模式")
+    parser.add_argument('--repeat', type=int, default=5, help="每条路径的更新次数")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PIL import Image
+    from PySide2.QtWidgets import QApplication
+    from modules.background_manager import BackgroundManager
+    app = QApplication([])  # noqa: F841  QPixmap 需要应用实例
+
+    image = _make_image(args.source, args.mode)
+    size = BackgroundManager.cover_size(image.size, *args.window)
+    background = image.resize(size, Image.Resampling.LANCZOS)
+    del image
+    scaled_bytes = size[0] * size[1] * 4
+
+    print(f"原图 {args.source[0]}x{args.source[1]} {args.mode}，窗口 {args.window[0]}x{args.window[1]}，"
+          f"缩放后 {size[0]}x{size[1]}")
+    for name, update in PATHS.items():
+        peak, rss, elapsed = measure(update, background, args.repeat)
+        line = (f"{name:<8} Python 峰值 {peak / 2**20:8.1f} MiB"
+                f"  ≈ {peak / scaled_bytes:5.1f} 份整图  每次 {elapsed * 1000:7.1f} ms")
+        if rss is not None:
+            line += f"  常驻增量 {rss / 2**20:8.1f} MiB"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""数值后端性能对比
+
+分别用 float、decimal、fraction 后端重复执行计算器的基本操作，
+输出每次操作的平均耗时（微秒）。
+
+用法：
+    python benchmarks/bench_numeric_backends.py [--number N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.calculator_core import CalculatorCore
+from modules.numeric_backend import create_backend
+
+BACKENDS = [
+    ('float', {}),
+    ('decimal', {'precision': 28}),
+    ('decimal', {'precision': 50}),
+    ('fraction', {}),
+]
+
+
+def binary_operation(core):
+    core.reset()
+    core.number_press('1234.5678')
+    core.operation_press('×')
+    core.number_press('0.0825')
+    core.calculate()
+
+
+def chained_addition(core):
+    core.reset()
+    core.number_press('0.1')
+    for _ in range(10):
+        core.operation_press('+')
+        core.number_press('0.1')
+    core.calculate()
+
+
+def special_operations(core):
+    core.reset()
+    core.number_press('2')
+    core.special_operation('√')
+    core.special_operation('x²')
+    core.special_operation('1/x')
+
+
+def expression(core):
+    core.evaluate_expression('2+3×4-5÷7')
+
+
+CASES = [
+    ('a × b', binary_operation, 1),
+    ('11 × +', chained_addition, 11),
+    ('√ x² 1/x', special_operations, 3),
+    ('evaluate_expression', expression, 1),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数值后端性能对比")
+    parser.add_argument('--number', type=int, default=20000, help="每项重复次数")
+    args = parser.parse_args()
+
+    header = f"{'backend':<22}" + ''.join(f"{name:>22}" for name, _, _ in CASES)
+    print(header)
+    print('-' * len(header))
+    for name, options in BACKENDS:
+        core = CalculatorCore(create_backend(name, **options))
+        label = name + ''.join(f" {key}={value}" for key, value in options.items())
+        row = f"{label:<22}"
+        for _, case, operations in CASES:
+            seconds = timeit.timeit(lambda: case(core), number=args.number)
+            row += f"{seconds / (args.number * operations) * 1e6:>19.3f} us"
+        print(row)
+
+    # 结果对比：1/3 × 3 与 (1e200)²
+    print()
+    for name, options in BACKENDS:
+        core = CalculatorCore(create_backend(name, **options))
+        third = core.evaluate_expression('1÷3×3-1')
+        core.reset()
+        core.number_press('1e200')
+        square = core.special_operation('x²')
+        if len(square) > 24:
+            square = f"{square[:12]}...（共 {len(square)} 位）"
+        print(f"{name:<10} 1÷3×3-1 = {third:<8} (1e200)² = {square}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""会话状态的内存开销对比
+
+创建大量处于典型状态（输入中的算式、内存中有值）的计算器会话，
+用 tracemalloc 统计每个会话占用的字节数：
+- dict：改动前的布局，状态保存在实例 __dict__ 中
+- slots：当前的 CalculatorCore（__slots__）
+- snapshot：只保留 CalculatorCore.snapshot() 的字节串，用时再 restore()
+
+用法：
+    python benchmarks/bench_session_memory.py [--sessions 100000] [--backend float]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.calculator_core import CalculatorCore
+from modules.numeric_backend import create_backend
+
+
+class DictCore:
+    """改动前的布局：与 CalculatorCore 相同的字段，保存在实例 __dict__ 中"""
+    def __init__(self, core):
+        for name in CalculatorCore.__slots__:
+            setattr(self, name, getattr(core, name))
+
+
+def make_core(backend, i):
+    """一个处于典型状态的会话：内存中有值，正在输入第二个操作数"""
+    core = CalculatorCore(backend)
+    core.number_press(str(i))
+    core.memory_operation('M+')
+    core.operation_press('×')
+    core.number_press(str(i % 1000))
+    core.decimal_press()
+    core.number_press('5')
+    return core
+
+
+LAYOUTS = {
+    'dict': lambda core: DictCore(core),
+    'slots': lambda core: core,
+    'snapshot': lambda core: core.snapshot(),
+}
+
+
+def measure(layout, backend, count):
+    """返回 (每个会话的字节数, 创建耗时秒数)"""
+    convert = LAYOUTS[layout]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    sessions = [convert(make_core(backend, i)) for i in range(count)]
+    elapsed = time.perf_counter() - start
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del sessions
+    return used / count, elapsed
+
+
+def measure_round_trip(backend, count):
+    """snapshot() + restore() 一次的平均耗时（微秒）"""
+    core = make_core(backend, 12345)
+    target = CalculatorCore(backend)
+    start = time.perf_counter()
+    for _ in range(count):
+        target.restore(core.snapshot())
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会话状态的内存开销对比")
+    parser.add_argument('--sessions', type=int, default=100000, help="同时存在的会话数")
+    parser.add_argument('--backend', default='float', help="数值后端（float / decimal / fraction）")
+    args = parser.parse_args()
+
+    backend = create_backend(args.backend)
+    print(f"{args.sessions} 个会话，{args.backend} 后端")
+    for layout in LAYOUTS:
+        per_session, elapsed = measure(layout, backend, args.sessions)
+        print(f"{layout:<9} 每个会话 {per_session:7.0f} 字节"
+              f"  合计 {per_session * args.sessions / 2**20:7.1f} MiB  创建 {elapsed:6.2f} s")
+    print(f"snapshot + restore 每次 {measure_round_trip(backend, 100000):.2f} µs")
+
+
+if __name__ == '__main__':
+    main()
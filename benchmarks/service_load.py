@@ -0,0 +1,132 @@
+"""本地计算服务压力测试
+
+启动（或连接已运行的）modules.eval_service，用指定数量的并发连接发送请求，
+每个连接最多同时有 --pipeline 个未完成的请求，输出 p50/p99 延迟和每秒请求数。
+
+用法：
+    python benchmarks/service_load.py [--concurrency 50] [--requests 100000] [--pipeline 16]
+                                      [--unix 路径 | --port 8765] [--connect]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 每个会话循环发送的请求，覆盖按键、百分比和完整算式
+SCRIPT = [
+    ('clear_all', []),
+    ('number_press', ['200']),
+    ('operation_press', ['+']),
+    ('number_press', ['5']),
+    ('special_operation', ['%']),
+    ('evaluate_expression', ['(1+2)×3÷4-5%']),
+    ('memory_operation', ['M+']),
+    ('calculate', []),
+]
+
+
+async def open_connection(args):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix)
+    return await asyncio.open_connection(args.host, args.port)
+
+
+async def run_client(client_id, total, args, latencies):
+    """一个连接：发送 total 个请求，最多 pipeline 个同时未完成"""
+    reader, writer = await open_connection(args)
+    window = asyncio.Semaphore(args.pipeline)
+    sent_at = {}
+
+    async def receive():
+        for _ in range(total):
+            line = await reader.readline()
+            response = json.loads(line)
+            latencies.append(time.perf_counter() - sent_at.pop(response['id']))
+            window.release()
+
+    receiver = asyncio.create_task(receive())
+    for request_id in range(total):
+        await window.acquire()
+        method, call_args = SCRIPT[request_id % len(SCRIPT)]
+        request = {'id': request_id, 'session': f"load-{client_id}", 'method': method, 'args': call_args}
+        sent_at[request_id] = time.perf_counter()
+        writer.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        if window.locked():
+            await writer.drain()
+    await writer.drain()
+    await receiver
+    writer.close()
+
+
+async def run_load(args):
+    latencies = []
+    per_client, extra = divmod(args.requests, args.concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(i, per_client + (1 if i < extra else 0), args, latencies)
+        for i in range(args.concurrency)
+    ))
+    return latencies, time.perf_counter() - start
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def start_server(args):
+    """在子进程中启动服务并等待其开始监听"""
+    command = [sys.executable, '-m', 'modules.eval_service']
+    command += ['--unix', args.unix] if args.unix else ['--host', args.host, '--port', str(args.port)]
+    server = subprocess.Popen(command, cwd=ROOT)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(_probe(args))
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError("计算服务启动超时")
+
+
+async def _probe(args):
+    _, writer = await open_connection(args)
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地计算服务压力测试")
+    parser.add_argument('--concurrency', type=int, default=50, help="并发连接数")
+    parser.add_argument('--requests', type=int, default=100000, help="请求总数")
+    parser.add_argument('--pipeline', type=int, default=16, help="每个连接同时未完成的请求数")
+    parser.add_argument('--unix', metavar='PATH', help="使用 Unix 套接字")
+    parser.add_argument('--host', default='127.0.0.1', help="服务地址")
+    parser.add_argument('--port', type=int, default=8765, help="服务端口")
+    parser.add_argument('--connect', action='store_true', help="连接已运行的服务，不启动子进程")
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.pipeline < 1 or args.requests < args.concurrency:
+        parser.error("并发数和流水线深度必须大于 0，请求数不能少于并发数")
+
+    server = None if args.connect else start_server(args)
+    try:
+        latencies, elapsed = asyncio.run(run_load(args))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    print(f"并发 {args.concurrency}，流水线 {args.pipeline}，请求 {len(latencies)}")
+    print(f"p50 {percentile(latencies, 0.50) * 1000:8.3f} ms")
+    print(f"p99 {percentile(latencies, 0.99) * 1000:8.3f} ms")
+    print(f"吞吐 {len(latencies) / elapsed:10.0f} 请求/秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,70 @@
-"""计算器主程序"""
+"""计算器主程序
+
+启动时先显示键盘，背景（以及 PIL）在第一帧绘制完成后才加载。
+使用 --profile-startup 输出导入和各初始化阶段的耗时。
+
+单实例模式（--single-instance 或 --tray）下，如果已有实例在运行，
+只把请求（显示窗口、--eval 的表达式）交给它，不导入界面模块直接退出。
+"""
+import argparse
+import re
 import sys
-from PySide2.QtWidgets import QApplication
-from PySide2.QtCore import Qt
-from modules.calculator_ui import CalculatorUI
-from modules.calculator_core import CalculatorCore
+from modules.startup_profile import StartupProfile
+from modules.undo_history import UndoHistory, pack_state, unpack_state
+
+profile = StartupProfile(enabled='--profile-startup' in sys.argv)
+profile.install_import_timer()
+
+# 粘贴的文本是一个普通数字时作为输入，而不是计算
+NUMBER_RE = re.compile(r'[0-9]+\.?[0-9]*|\.[0-9]+')
+# 从表格复制的单元格中的千位分隔符和货币符号，例如 "1,234.56"、"$12"
+CELL_SYMBOLS_RE = re.compile(r'(?<=[0-9]),(?=[0-9]{3})|[$¥￥€£]')
+# 计算出错时返回的消息
+ERROR_MESSAGES = ("错误", "无效输入", "除数不能为零")
 
 class Calculator:
     """计算器应用程序类"""
     def __init__(self):
+        # 界面模块在确定要启动新实例后才导入
+        from modules.calculator_ui import CalculatorUI
+        from modules.calculator_core import CalculatorCore
+        from modules.session_snapshot import SessionSnapshot
         self.core = CalculatorCore()
-        self.ui = CalculatorUI(self.handle_button, self.handle_memory)
+        self.undo_history = UndoHistory()
+        self.ui = CalculatorUI(self.handle_button, self.handle_memory, self.undo, self.redo,
+                               self.handle_paste)
         
-        # 恢复背景
-        if self.ui.background_manager.current_background:
-            # 获取窗口大小
-            width = self.ui.width()
-            height = self.ui.height()
-            bg_image = self.ui.background_manager.get_background(width, height)
-            if bg_image:
-                self.ui.update_background(bg_image)
+        # 恢复上次退出时的会话（包括缩放好的背景）
+        self.snapshot = SessionSnapshot()
+        self.snapshot.restore(self.core, self.ui, self.ui.settings.get('background'))
+    
+    def save_session(self):
+        """退出时保存会话快照"""
+        self.ui.flush_display()
+        self.snapshot.save(self.core, self.ui, self.ui.settings.get('background'))
+    
+    def capture_state(self):
+        """当前核心状态和显示内容，用于撤销/重做"""
+        return pack_state(self.core, self.ui.expression_text(), self.ui.result_text())
+    
+    def apply_state(self, state):
+        """恢复 capture_state 保存的状态"""
+        snapshot, expression, result = unpack_state(state)
+        self.core.restore(snapshot)
+        self.ui.set_display(expression, result)
+        self.ui.update_memory_indicator(self.core.has_memory)
+    
+    def undo(self):
+        """撤销上一步"""
+        state = self.undo_history.undo(self.capture_state())
+        if state is not None:
+            self.apply_state(state)
+    
+    def redo(self):
+        """重做下一步"""
+        state = self.undo_history.redo(self.capture_state())
+        if state is not None:
+            self.apply_state(state)
     
     def format_expression(self, num):
         """格式化表达式中的数字"""
@@ -30,8 +76,19 @@ class Calculator:
         except:
             return str(num)
     
+    def record_change(self, before):
+        """状态确实改变时才把修改前的状态记入撤销历史，没有变化的按键不清除重做"""
+        if self.capture_state() != before:
+            self.undo_history.record(before)
+    
     def handle_button(self, text):
         """处理按钮点击"""
+        before = self.capture_state()
+        self.press_button(text)
+        self.record_change(before)
+    
+    def press_button(self, text):
+        """执行一次按键"""
         expression = ""
         result = ""
         
@@ -45,45 +102,14 @@ class Calculator:
                 expression = f"{self.format_expression(self.core.current_num)} ="
                 result = self.core.current_num
                 return self.ui.update_display(expression, result)
+            return
         
-        # 如果是带等号的表达式，提取表达式部分并解析
+        # 如果是带等号的表达式，交给表达式引擎按优先级计算
         if text.endswith('='):
-            text = text[:-1]  # 移除等号
-            # 解析表达式
-            current_num = ""
-            operation = None
-            first_num = None
-            
-            # 解析每个字符
-            for char in text:
-                if char.isdigit() or char == '.':
-                    current_num += char
-                elif char in ['+', '-', '×', '÷']:
-                    if current_num:
-                        if first_num is None:
-                            first_num = current_num
-                            current_num = ""
-                        else:
-                            # 执行前一个运算
-                            self.core.reset()
-                            self.core.number_press(first_num)
-                            self.core.operation_press(operation)
-                            self.core.number_press(current_num)
-                            first_num = self.core.calculate()  # 使用计算结果作为下一个运算的第一个数
-                            current_num = ""
-                    operation = char
-            
-            # 处理最后的数字
-            if current_num and first_num and operation:
-                # 执行最后一个运算
-                self.core.reset()
-                self.core.number_press(first_num)
-                self.core.operation_press(operation)
-                self.core.number_press(current_num)
-                # 计算结果
-                expression = f"{text} ="
-                result = self.core.calculate()
-                return self.ui.update_display(expression, result)
+            text = text[:-1].strip()  # 移除等号
+            expression = f"{text} ="
+            result = self.core.evaluate_expression(text)
+            return self.ui.update_display(expression, result)
 
         if text.isdigit():
             self.core.number_press(text)
@@ -137,7 +163,7 @@ class Calculator:
             # 立即计算结果
             result = self.core.special_operation(text)
             # 更新表达式以显示结果
-            if result != "错误" and result != "无效输入" and result != "除数不能为零":
+            if result not in ERROR_MESSAGES:
                 if text == '%':
                     expression = f"{current}% = {result}"
                 elif text == '±':
@@ -151,19 +177,106 @@ class Calculator:
         
         self.ui.update_display(expression, result)
     
+    def handle_paste(self, text):
+        """处理粘贴的文本：整体解析一次，界面只更新一次
+
+        单行的普通数字作为当前输入，其他单行文本作为算式计算；
+        多行文本逐行计算，每行的结果都写入历史记录，显示最后一行。
+        含等号的行（如从历史记录复制的 "5 + 3 = 8"）只取最后一个等号之后的部分，
+        千位分隔符和货币符号被去掉；计算出错的行只显示，不写入历史记录。
+        """
+        lines = [CELL_SYMBOLS_RE.sub('', line.strip().rstrip('=').rpartition('=')[2]).strip()
+                 for line in text.splitlines()]
+        lines = [line for line in lines if line]
+        if not lines:
+            return
+        self.undo_history.record(self.capture_state())
+        
+        if len(lines) == 1 and NUMBER_RE.fullmatch(lines[0]):
+            # 与逐个按键输入相同：整数部分、小数点、小数部分
+            integer, dot, fraction = lines[0].partition('.')
+            if integer:
+                self.core.number_press(integer)
+            if dot:
+                self.core.decimal_press()
+            if fraction:
+                self.core.number_press(fraction)
+            if self.core.previous_num is not None and self.core.operation:
+                expression = f"{self.format_expression(self.core.previous_num)} {self.core.operation} {self.core.current_num}"
+            else:
+                expression = self.core.current_num
+            return self.ui.update_display(expression, "")
+        
+        # 前面的行交给批量计算（与当前核心使用同一数值后端），
+        # 最后一行用当前核心计算，使其结果成为当前数
+        from modules.batch import evaluate_lines
+        results = evaluate_lines(lines[:-1], self.core.backend) if len(lines) > 1 else []
+        results.append(self.core.evaluate_expression(lines[-1]))
+        records = [(f"{line} =", result) for line, result in zip(lines, results)]
+        self.ui.show_results([record for record in records if record[1] not in ERROR_MESSAGES], records[-1])
+    
     def handle_memory(self, operation):
         """处理内存操作"""
+        before = self.capture_state()
         self.core.memory_operation(operation.upper())
         self.ui.update_memory_indicator(self.core.has_memory)
+        self.record_change(before)
+    
+    def handle_message(self, message):
+        """处理其他实例发来的请求"""
+        expression = message.get('expression')
+        if expression:
+            self.handle_button(f"{expression} =")
+        if message.get('command') == 'activate':
+            self.ui.activate()
     
-    def run(self):
+    def run(self, hidden=False):
         """运行应用程序"""
-        self.ui.show()
+        if not hidden:
+            self.ui.show()
+
+def parse_args(argv):
+    """解析命令行参数，未识别的参数留给 Qt"""
+    parser = argparse.ArgumentParser(description="计算器")
+    parser.add_argument('--profile-startup', action='store_true', help="输出启动耗时分析")
+    parser.add_argument('--single-instance', action='store_true',
+                        help="已有实例在运行时把请求交给它并退出")
+    parser.add_argument('--eval', metavar='EXPR', help="计算表达式并显示结果")
+    parser.add_argument('--tray', action='store_true',
+                        help="常驻系统托盘，启动时隐藏窗口（隐含 --single-instance）")
+    args, qt_args = parser.parse_known_args(argv[1:])
+    return args, argv[:1] + qt_args
 
 def main():
-    app = QApplication(sys.argv)
+    args, qt_argv = parse_args(sys.argv)
+    instance = None
+    if args.single_instance or args.tray:
+        from modules.single_instance import SingleInstance
+        message = {'command': 'activate'}
+        if args.eval:
+            message['expression'] = args.eval
+        if SingleInstance.send(message):
+            return
+        instance = SingleInstance()
+    
+    from PySide2.QtWidgets import QApplication
+    profile.mark("导入模块")
+    app = QApplication(qt_argv)
+    profile.mark("创建 QApplication")
     calculator = Calculator()
-    calculator.run()
+    app.aboutToQuit.connect(calculator.save_session)
+    profile.mark("创建界面")
+    if instance is not None:
+        instance.message_received.connect(calculator.handle_message)
+        instance.listen()
+    if args.eval:
+        calculator.handle_message({'expression': args.eval})
+    hidden = args.tray and calculator.ui.enable_tray()
+    calculator.ui.first_paint_callbacks.insert(0, lambda: profile.mark("第一帧绘制"))
+    calculator.ui.first_paint_callbacks.append(lambda: profile.mark("推迟的初始化（背景）"))
+    calculator.ui.first_paint_callbacks.append(profile.report)
+    calculator.run(hidden)
+    profile.mark("显示窗口")
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
@@ -1,9 +1,17 @@
-"""计算器模块包"""
-from .calculator_core import CalculatorCore
-from .calculator_ui import CalculatorUI
-from .background_manager import BackgroundManager
-from .keyboard_handler import KeyboardHandler
-from .base_widget import BackgroundWidget
+"""计算器模块包
+
+各模块按需导入，这样无界面的工具（如 ``python -m modules.batch``）
+不会因为包初始化而加载 PySide2。
+"""
+import importlib
+
+_EXPORTS = {
+    'CalculatorCore': '.calculator_core',
+    'CalculatorUI': '.calculator_ui',
+    'BackgroundManager': '.background_manager',
+    'KeyboardHandler': '.keyboard_handler',
+    'BackgroundWidget': '.base_widget',
+}
 
 __all__ = [
     'CalculatorCore',
@@ -12,3 +20,12 @@ __all__ = [
     'KeyboardHandler',
     'BackgroundWidget'
 ]
+
+
+def __getattr__(name):
+    """延迟导入导出的类"""
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,187 @@
+"""动画背景模块
+
+GIF 等动画图片作为背景时，帧在线程池中按顺序增量解码，并预先缩放到窗口大小。
+解码后的帧放在有内存预算的缓存中（同时计入 ImageMemory 的总预算），
+超出预算时淘汰帧，需要时重新解码，内存占用不会随帧数增长。
+
+帧的切换由 BackgroundWidget 的定时器驱动：每次按经过的时间计算当前帧，
+界面线程繁忙时直接跳过错过的帧，不会积压。
+"""
+import math
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+
+from PIL import Image
+from PySide2.QtGui import QPixmap
+
+from .image_bridge import pil_to_qimage
+from .image_memory import ImageCache, image_bytes
+
+
+class FrameDecoder:
+    """按顺序解码动画帧（可在工作线程中调用，内部加锁）"""
+    # 帧间隔的下限（毫秒），过小的间隔按浏览器的惯例当作默认间隔
+    MIN_DURATION = 20
+    DEFAULT_DURATION = 100
+
+    def __init__(self, path):
+        self.path = path
+        self.image = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def probe(cls, path):
+        """返回各帧的显示时长（毫秒），不是动画时返回 None"""
+        with Image.open(path) as image:
+            if not getattr(image, 'is_animated', False):
+                return None
+            durations = []
+            for index in range(image.n_frames):
+                image.seek(index)
+                duration = image.info.get('duration') or 0
+                durations.append(duration if duration >= cls.MIN_DURATION else cls.DEFAULT_DURATION)
+            return durations
+
+    @staticmethod
+    def cover_size(frame_size, width, height):
+        """按比例缩放到刚好覆盖窗口的尺寸"""
+        frame_width, frame_height = frame_size
+        scale = max(width / frame_width, height / frame_height)
+        return (max(1, math.ceil(frame_width * scale)), max(1, math.ceil(frame_height * scale)))
+
+    def decode(self, indices, size, cancelled):
+        """解码并缩放指定的帧，返回 [(帧号, QImage)]"""
+        frames = []
+        with self.lock:
+            if self.image is None:
+                self.image = Image.open(self.path)
+            for index in indices:
+                if cancelled():
+                    break
+                # 向后跳转时 PIL 会从第一帧重新解码
+                self.image.seek(index)
+                frame = self.image.convert('RGBA')
+                target = self.cover_size(frame.size, *size)
+                if frame.size != target:
+                    frame = frame.resize(target, Image.Resampling.BILINEAR)
+                frames.append((index, pil_to_qimage(frame)))
+        return frames
+
+    def close(self):
+        """关闭图片文件"""
+        with self.lock:
+            if self.image is not None:
+                self.image.close()
+                self.image = None
+
+
+class FrameCache(ImageCache):
+    """有内存预算的帧缓存
+
+    动画循环播放，最近最少使用策略恰好会淘汰下一个要用的帧，
+    因此超出预算时淘汰按播放顺序离当前帧最远的帧。
+    """
+    # 重新解码一帧的相对代价（顺序解码，比高质量缩放便宜）
+    COST = 1.0
+
+    def __init__(self, budget, frame_count, memory=None):
+        super().__init__('frames', memory, max_bytes=budget, cost=self.COST)
+        self.frame_count = frame_count
+        self.current = 0
+
+    def distance(self, index):
+        """按播放顺序从当前帧到 index 的距离"""
+        return (index - self.current) % self.frame_count
+
+    def victim(self):
+        if not self.entries:
+            return None
+        return max(self.entries, key=self.distance)
+
+    def put(self, index, pixmap, current=None):
+        """加入一帧；缓存已满且新帧比缓存中的帧都远时不缓存"""
+        if current is not None:
+            self.current = current
+        if self.entries and self.resident_bytes + image_bytes(pixmap) > self.max_bytes and \
+                self.distance(index) > self.distance(self.victim()):
+            return
+        super().put(index, pixmap)
+
+    def capacity(self, frame_bytes):
+        """预算内可容纳的帧数"""
+        return max(1, self.max_bytes // max(frame_bytes, 1))
+
+
+class AnimatedBackground:
+    """动画背景的帧时间轴和帧缓存"""
+    # 帧缓存的默认内存预算（字节）
+    FRAME_BUDGET = 64 * 2**20
+    # 每次解码时预取的后续帧数
+    PREFETCH = 4
+
+    def __init__(self, path, durations, worker, budget=FRAME_BUDGET, memory=None):
+        self.path = path
+        self.durations = durations
+        self.ends = list(accumulate(durations))
+        self.total = self.ends[-1]
+        self.worker = worker
+        self.decoder = FrameDecoder(path)
+        self.frames = FrameCache(budget, len(durations), memory)
+        self.size = None
+        self.current = 0
+        self.frame_ready = None  # 新帧解码完成时的回调
+
+    @property
+    def frame_count(self):
+        return len(self.durations)
+
+    def frame_at(self, elapsed):
+        """返回经过 elapsed 毫秒时应显示的帧号，以及距下一帧的毫秒数"""
+        position = elapsed % self.total
+        index = bisect_right(self.ends, position)
+        return index, self.ends[index] - position
+
+    def set_size(self, width, height):
+        """窗口大小改变后按新大小重新解码"""
+        if self.size != (width, height):
+            self.size = (width, height)
+            self.worker.cancel('frames')
+            self.frames.clear()
+
+    def frame(self, index):
+        """返回已解码的帧（QPixmap），并在后台解码缺少的当前帧和后续帧"""
+        self.current = self.frames.current = index
+        if self.size:
+            self.prefetch(index)
+        return self.frames.get(index)
+
+    def prefetch(self, index):
+        """后台解码从 index 开始缺少的帧，同一时间只有一个解码任务"""
+        if self.worker.is_busy('frames'):
+            return
+        frame_bytes = self.size[0] * self.size[1] * 4
+        count = min(self.PREFETCH + 1, self.frames.capacity(frame_bytes), self.frame_count)
+        wanted = [(index + offset) % self.frame_count for offset in range(count)]
+        missing = [i for i in wanted if i not in self.frames]
+        if not missing:
+            return
+        size = self.size
+        decoder = self.decoder
+
+        def decoded(frames):
+            if size != self.size:
+                return
+            for i, qimage in frames:
+                self.frames.put(i, QPixmap.fromImage(qimage), self.current)
+            if self.frame_ready:
+                self.frame_ready()
+
+        self.worker.submit('frames', lambda cancelled: decoder.decode(missing, size, cancelled), decoded)
+
+    def close(self):
+        """停止解码并释放帧和文件"""
+        self.worker.cancel('frames')
+        self.frames.close()
+        self.frame_ready = None
+        self.decoder.close()
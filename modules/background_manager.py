@@ -1,9 +1,15 @@
 """背景管理器模块"""
 from PySide2.QtWidgets import (QFileDialog, QDialog, QVBoxLayout, QPushButton, 
                             QLabel, QSlider, QHBoxLayout)
-from PySide2.QtCore import Qt
+from PySide2.QtCore import Qt, QTimer
+from PySide2.QtGui import QPixmap, QGuiApplication
 from PIL import Image
-import json
+from .image_worker import ImageWorker
+from .image_bridge import pil_to_qimage, to_qpixmap
+from .thumbnail_cache import ThumbnailCache
+from .animated_background import AnimatedBackground, FrameDecoder
+from .image_memory import ImageMemory, ImageCache, ImageSet
+from .settings_store import SettingsStore
 import os
 import logging
 
@@ -11,12 +17,89 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class BackgroundManager:
-    """背景管理器类"""
+class ResizeStats:
+    """调整大小流水线的统计信息"""
     def __init__(self):
+        self.requests = 0  # 未命中缓存的调整大小请求
+        self.cache_hits = 0  # 直接使用缓存的请求
+        self.previews = 0  # 已显示的低成本预览
+        self.final_passes = 0  # 执行的高质量缩放
+    
+    @property
+    def skipped_passes(self):
+        """因防抖而省去的高质量缩放次数"""
+        return max(self.requests - self.final_passes, 0)
+    
+    def as_dict(self):
+        """以字典形式返回统计信息"""
+        return {
+            'requests': self.requests,
+            'cache_hits': self.cache_hits,
+            'previews': self.previews,
+            'final_passes': self.final_passes,
+            'skipped_passes': self.skipped_passes,
+        }
+
+class BackgroundManager:
+    """背景管理器类
+
+    选定背景后一次性建立逐级减半的图像金字塔，调整窗口大小时从最接近的
+    层级缩放，并按尺寸档位缓存最终的 QPixmap。
+    图像解码和缩放都在线程池中进行，结果通过回调回到界面线程，
+    同一类请求只应用最新的一个。
+    透明度在绘制时由背景部件应用，调整透明度不会重建图像。
+    
+    启动时等到知道窗口大小再加载背景：优先读取磁盘缩略图缓存，
+    未命中时 JPEG 按窗口需要的尺寸降采样解码，需要更大尺寸时再解码原图。
+    动画图片的第一帧作为静态背景，之后由背景部件逐帧播放。
+    
+    金字塔只保留屏幕用得到的层级，原图在金字塔建好后释放。金字塔、QPixmap
+    和动画帧都计入同一个 ImageMemory，超出总预算时按代价跨缓存淘汰。
+    
+    调整窗口大小分两遍：每次立即用双线性插值从最接近的层级生成低成本预览，
+    停止拖动后再做一次 LANCZOS 高质量缩放（结果进入缓存）。两遍都直接缩放到
+    刚好覆盖窗口的大小，背景部件只需居中绘制，不再在界面线程中缩放。
+    防抖只有 final_timer 一个定时器，动画帧也在这时按新大小重新解码。
+    """
+    # 金字塔最小层级的长边（像素）
+    PYRAMID_MIN_SIZE = 256
+    # 窗口尺寸按此步长分档，同一档位复用同一个 QPixmap
+    SIZE_BUCKET = 64
+    # 缓存的 QPixmap 数量
+    PIXMAP_CACHE_SIZE = 8
+    # 停止调整大小后进行高质量缩放的延迟（毫秒）
+    FINAL_PASS_DELAY = 200
+    # 动画帧缓存的内存预算（字节）
+    FRAME_CACHE_BUDGET = AnimatedBackground.FRAME_BUDGET
+    # 所有背景图像缓存的总内存预算（字节）
+    MEMORY_BUDGET = ImageMemory.DEFAULT_BUDGET
+    # 缩放后 QPixmap 的相对重建代价（LANCZOS 缩放比顺序解码一帧更贵）
+    PIXMAP_COST = 4.0
+    
+    def __init__(self, settings=None):
         self.callback = None
+        self.opacity_callback = None
+        self.animation_callback = None
+        self.animation = None  # 当前的动画背景
         self.current_background = None
-        self.settings_file = "background_config.json"
+        self.background_path = None
+        self.pyramid = []  # 由大到小的 RGB/RGBA 图像
+        self.memory = ImageMemory(self.MEMORY_BUDGET)
+        self.pixmap_cache = ImageCache('pixmaps', self.memory,
+                                       max_entries=self.PIXMAP_CACHE_SIZE, cost=self.PIXMAP_COST)
+        self.pyramid_images = ImageSet('pyramid', self.memory)
+        self.last_size = None  # 最近一次请求的窗口大小
+        self.source_size = None  # 原图尺寸（金字塔可能来自降采样解码或缩略图）
+        self.full_source = False  # 金字塔是否来自原图的完整解码（之后不必再解码）
+        self.pending_path = None  # 等待窗口大小确定后加载的背景
+        self.thumbnail_cache = ThumbnailCache()
+        self.worker = ImageWorker()
+        self.resize_stats = ResizeStats()
+        self.final_timer = QTimer()
+        self.final_timer.setSingleShot(True)
+        self.final_timer.setInterval(self.FINAL_PASS_DELAY)
+        self.final_timer.timeout.connect(self.render_final_pass)
+        self.settings = settings if settings is not None else SettingsStore()
         self.opacity = 0.8  # 默认透明度
         self.dialog = None
         self.load_settings()
@@ -27,34 +110,38 @@ class BackgroundManager:
         if self.current_background:
             self.apply_background()
     
+    def set_opacity_callback(self, callback):
+        """设置透明度回调函数"""
+        self.opacity_callback = callback
+        callback(self.opacity)
+    
+    def set_animation_callback(self, callback):
+        """设置动画回调函数（参数为 AnimatedBackground 或 None）"""
+        self.animation_callback = callback
+        callback(self.animation)
+    
+    def set_animation(self, animation):
+        """替换当前的动画背景"""
+        if self.animation is not None:
+            self.animation.close()
+        self.animation = animation
+        if self.animation_callback:
+            self.animation_callback(animation)
+    
     def load_settings(self):
-        """加载设置"""
-        try:
-            if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                    bg_path = settings.get('background')
-                    self.opacity = settings.get('opacity', 0.8)
-                    if bg_path and os.path.exists(bg_path):
-                        try:
-                            self.current_background = Image.open(bg_path)
-                        except Exception as e:
-                            logger.error(f"无法加载背景图片 {bg_path}: {str(e)}")
-                            self.current_background = None
-        except Exception as e:
-            logger.error(f"加载设置文件时出错: {str(e)}")
+        """加载设置（背景图片在后台加载）"""
+        self.opacity = self.settings.get('opacity')
+        bg_path = self.settings.get('background')
+        if bg_path and os.path.exists(bg_path):
+            # 推迟到第一次请求背景时按窗口大小加载
+            self.pending_path = bg_path
     
     def save_settings(self):
-        """保存设置"""
-        try:
-            settings = {
-                'background': str(self.current_background.filename) if self.current_background else None,
-                'opacity': self.opacity
-            }
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"保存设置文件时出错: {str(e)}")
+        """保存设置（只更新内存，由设置存储在后台合并写盘）"""
+        self.settings.update({
+            'background': self.background_path,
+            'opacity': self.opacity
+        })
     
     def show_settings(self, parent=None):
         """显示设置对话框"""
@@ -133,18 +220,36 @@ class BackgroundManager:
             self.opacity_slider.valueChanged.connect(self.opacity_changed)
             layout.addWidget(self.opacity_slider)
             
+            # 添加缓存和调整大小的统计信息
+            self.stats_label = QLabel("")
+            self.stats_label.setAlignment(Qt.AlignCenter)
+            layout.addWidget(self.stats_label)
+            
             # 添加关闭按钮
             close_button = QPushButton("关闭")
             close_button.clicked.connect(self.dialog.close)
             layout.addWidget(close_button)
         
+        self.update_stats_label()
         self.dialog.show()
     
+    def update_stats_label(self):
+        """在设置对话框中显示 memory_report 和 resize_report 的统计信息"""
+        if self.dialog is None:
+            return
+        memory = self.memory_report()
+        resize = self.resize_report()
+        self.stats_label.setText(
+            f"图像缓存 {memory['total'] / 2**20:.1f} / {memory['budget'] / 2**20:.0f} MiB\n"
+            f"调整大小：预览 {resize['previews']} 次，高质量缩放 {resize['final_passes']} 次，"
+            f"命中缓存 {resize['cache_hits']} 次，省去 {resize['skipped_passes']} 次")
+    
     def opacity_changed(self, value):
         """处理透明度变化"""
         self.opacity = value / 100
-        self.apply_background()
-        self.save_settings()
+        if self.opacity_callback:
+            self.opacity_callback(self.opacity)
+        self.settings.set('opacity', self.opacity)
     
     def choose_background(self):
         """选择背景图片"""
@@ -154,45 +259,287 @@ class BackgroundManager:
             "图片文件 (*.png *.jpg *.jpeg *.bmp *.gif)"
         )
         if file_name:
-            try:
-                self.current_background = Image.open(file_name)
-                self.apply_background()
-                self.save_settings()
-            except Exception as e:
-                logger.error(f"无法加载背景图片 {file_name}: {str(e)}")
+            self.load_background(file_name, save=True, size=self.last_size)
     
     def clear_background(self):
         """清除背景"""
-        self.current_background = None
+        self.worker.cancel('load')
+        self.pending_path = None
+        self.background_path = None
+        self.set_animation(None)
+        self.set_background_image(None)
         if self.callback:
             self.callback(None)
         self.save_settings()
     
+    def load_background(self, path, save=False, size=None):
+        """在后台解码图片并建立金字塔，完成后应用背景
+        
+        给出窗口大小时先查缩略图缓存，命中则不解码原图；
+        未命中时 JPEG 只解码到窗口需要的尺寸，并把缩放结果写入缓存。
+        """
+        target = self.bucket_size(*size) if size else None
+        screen_size = self.screen_size()
+        
+        def job(cancelled):
+            # 动画只读取各帧时长，帧在播放时再解码
+            durations = FrameDecoder.probe(path)
+            if target:
+                cached = self.thumbnail_cache.get(path, target)
+                if cached:
+                    image, source_size = cached
+                    rendered = self.to_qimage(image)
+                    return path, image, self.build_pyramid(image), source_size, rendered, durations, False
+            image = Image.open(path)
+            source_size = image.size
+            if target and image.format == 'JPEG':
+                image.draft(image.mode, self.cover_size(source_size, *target))
+            image.load()
+            if cancelled():
+                return None
+            full = image.size == source_size
+            pyramid = self.build_pyramid(image)
+            if screen_size:
+                pyramid = self.trim_pyramid(pyramid, *screen_size)
+            if all(level is not image for level in pyramid):
+                # 金字塔不再引用原图，释放原图及其文件句柄
+                image.close()
+            rendered = None
+            if target:
+                background = self.scale_background(pyramid, *target)
+                self.thumbnail_cache.put(path, target, background, source_size)
+                rendered = self.to_qimage(background)
+            return path, pyramid[0], pyramid, source_size, rendered, durations, full
+        
+        def loaded(result):
+            if result:
+                self.background_path, image, pyramid, source_size, rendered, durations, full = result
+                if not durations:
+                    self.set_animation(None)
+                elif self.animation is None or self.animation.path != path:
+                    self.set_animation(AnimatedBackground(
+                        path, durations, self.worker, self.FRAME_CACHE_BUDGET, self.memory))
+                self.set_background_image(image, pyramid)
+                self.source_size = source_size
+                self.full_source = full
+                if rendered is not None:
+                    self.pixmap_cache.put(target, QPixmap.fromImage(rendered))
+                self.apply_background()
+                if save:
+                    self.save_settings()
+        
+        def failed(error):
+            logger.error(f"无法加载背景图片 {path}: {error}")
+        
+        self.worker.submit('load', job, loaded, failed)
+    
+    def set_background_image(self, image, pyramid=None):
+        """设置背景图片并重建金字塔"""
+        self.worker.cancel('resize')
+        self.final_timer.stop()
+        self.current_background = image
+        self.source_size = image.size if image else None
+        self.full_source = False
+        self.pixmap_cache.clear()
+        if image and pyramid is None:
+            pyramid = self.build_pyramid(image)
+        self.pyramid = pyramid or []
+        self.pyramid_images.set(self.pyramid)
+    
+    @classmethod
+    def build_pyramid(cls, image):
+        """建立逐级减半的图像金字塔（第0层为原图，可在工作线程中调用）
+
+        RGB 和 RGBA 图像保持原模式，其他模式按是否带透明通道转换为 RGBA 或 RGB。
+        """
+        level = image
+        if level.mode not in ('RGB', 'RGBA'):
+            has_alpha = level.mode in ('LA', 'PA') or 'transparency' in level.info
+            level = level.convert('RGBA' if has_alpha else 'RGB')
+        pyramid = [level]
+        while max(level.size) > cls.PYRAMID_MIN_SIZE * 2:
+            level = level.reduce(2)
+            pyramid.append(level)
+        return pyramid
+    
+    @classmethod
+    def trim_pyramid(cls, pyramid, width, height):
+        """去掉比该窗口大小所需层级更大的层级"""
+        level = cls.nearest_level(pyramid, *cls.cover_size(pyramid[0].size, width, height))
+        for index, candidate in enumerate(pyramid):
+            if candidate is level:
+                return pyramid[index:]
+        return pyramid
+    
+    @staticmethod
+    def screen_size():
+        """虚拟桌面（所有屏幕）的大小，没有屏幕时返回 None"""
+        screen = QGuiApplication.primaryScreen()
+        if screen is None:
+            return None
+        size = screen.virtualSize()
+        return size.width(), size.height()
+    
+    @staticmethod
+    def nearest_level(pyramid, width, height):
+        """返回不小于目标尺寸的最小金字塔层级"""
+        for level in reversed(pyramid):
+            if level.width >= width and level.height >= height:
+                return level
+        return pyramid[0]
+    
+    # 与动画帧相同：按原图比例缩放到刚好覆盖窗口的尺寸
+    cover_size = staticmethod(FrameDecoder.cover_size)
+    
+    @classmethod
+    def scale_background(cls, pyramid, width, height, resample=Image.Resampling.LANCZOS):
+        """按窗口大小从金字塔缩放出刚好覆盖窗口的背景（可在工作线程中调用）
+        
+        尺寸恰好等于某一层级时直接返回该层级，调用方不应修改返回的图像。
+        """
+        target = cls.cover_size(pyramid[0].size, width, height)
+        
+        # 从最接近的层级缩放，避免每次都处理原图
+        level = cls.nearest_level(pyramid, *target)
+        if level.size == target:
+            return level
+        return level.resize(target, resample)
+    
     def apply_background(self):
         """应用背景"""
         if self.callback and self.current_background:
-            # 创建半透明背景
-            background = self.current_background.copy()
-            if background.mode in ('RGBA', 'LA') or (background.mode == 'P' and 'transparency' in background.info):
-                background.putalpha(int(255 * self.opacity))
+            if self.last_size:
+                self.request_background(*self.last_size)
             else:
-                background = background.convert('RGBA')
-                background.putalpha(int(255 * self.opacity))
-            self.callback(background)
+                # 尚不知道窗口大小时使用最小层级
+                self.callback(self.to_pixmap(self.pyramid[-1]))
     
-    def get_background(self, width, height):
-        """获取调整大小后的背景图片"""
-        if self.current_background:
-            # 调整图片大小以适应窗口
-            background = self.current_background.copy()
-            background.thumbnail((width * 2, height * 2), Image.Resampling.LANCZOS)
-            
-            # 创建半透明背景
-            if background.mode in ('RGBA', 'LA') or (background.mode == 'P' and 'transparency' in background.info):
-                background.putalpha(int(255 * self.opacity))
+    def bucket_size(self, width, height):
+        """将窗口大小向上取整到尺寸档位"""
+        bucket = self.SIZE_BUCKET
+        return (-(-width // bucket) * bucket, -(-height // bucket) * bucket)
+    
+    def request_background(self, width, height):
+        """请求指定窗口大小的背景，QPixmap 通过回调函数送回
+        
+        命中缓存时立即回调；否则先在线程池中生成低成本预览，
+        并推迟高质量缩放，直到调整大小停止。
+        """
+        self.last_size = (width, height)
+        if self.pending_path:
+            if self.pixmap_cache.get(self.bucket_size(width, height)) is not None:
+                # 会话快照恢复的背景正好是这个尺寸档位，等到大小改变时再加载原图
+                return
+            path, self.pending_path = self.pending_path, None
+            self.load_background(path, size=self.last_size)
+            return
+        if not self.pyramid or not self.callback:
+            return
+        size = self.bucket_size(width, height)
+        pixmap = self.pixmap_cache.get(size)
+        if pixmap is not None:
+            self.worker.cancel('resize')
+            self.resize_stats.cache_hits += 1
+            self.callback(pixmap)
+            # 动画帧仍需在停止调整后按新大小解码
+            if self.animation is not None:
+                self.final_timer.start()
             else:
-                background = background.convert('RGBA')
-                background.putalpha(int(255 * self.opacity))
-            
-            return background
-        return None
+                self.final_timer.stop()
+            return
+        
+        self.resize_stats.requests += 1
+        if self.needs_full_source(width, height) and not self.worker.is_busy('load'):
+            # 当前金字塔不够大，解码原图，期间先用已有的层级预览
+            self.load_background(self.background_path)
+        pyramid = self.pyramid
+        
+        # 第一遍：按窗口大小双线性缩放，不进入缓存
+        def preview_job(cancelled):
+            return self.to_qimage(self.scale_background(
+                pyramid, width, height, Image.Resampling.BILINEAR))
+        
+        def preview_ready(qimage):
+            self.resize_stats.previews += 1
+            if self.callback:
+                self.callback(QPixmap.fromImage(qimage), preview=True)
+        
+        self.worker.submit('resize', preview_job, preview_ready)
+        # 第二遍：防抖，停止调整大小后执行
+        self.final_timer.start()
+    
+    def seed_pixmap(self, path, size, pixmap):
+        """把会话快照恢复的背景（按窗口大小 size 缩放好）作为该尺寸档位的缓存
+        
+        只在 path 是等待加载的背景时生效，之后请求同一档位时不解码原图。
+        """
+        if pixmap is not None and path == self.pending_path:
+            self.pixmap_cache.put(self.bucket_size(*size), pixmap)
+    
+    def needs_full_source(self, width, height):
+        """当前金字塔是否小于该窗口大小所需的尺寸
+        
+        原图已完整解码过时返回 False：金字塔只是按屏幕大小裁掉了更大的层级，
+        窗口比屏幕还大时再次解码也得不到更大的层级。
+        """
+        if not self.source_size or self.full_source or self.source_size == self.pyramid[0].size:
+            return False
+        target = self.cover_size(self.source_size, width, height)
+        return target[0] > self.pyramid[0].width or target[1] > self.pyramid[0].height
+    
+    def render_final_pass(self):
+        """调整大小停止后：为最近一次请求的大小执行高质量缩放，动画帧按新大小重新解码
+        
+        按尺寸档位缩放，结果不小于窗口，部件直接居中绘制。
+        """
+        if not self.last_size:
+            return
+        if self.animation is not None:
+            self.animation.set_size(*self.last_size)
+        if not self.pyramid:
+            return
+        size = self.bucket_size(*self.last_size)
+        pixmap = self.pixmap_cache.get(size)
+        if pixmap is not None:
+            # 已有缓存时也送回高质量背景，部件据此结束快速缩放
+            if self.callback:
+                self.callback(pixmap)
+            return
+        self.resize_stats.final_passes += 1
+        logger.debug(f"背景缩放统计: {self.resize_stats.as_dict()}")
+        pyramid = self.pyramid
+        
+        def job(cancelled):
+            background = self.scale_background(pyramid, size[0], size[1])
+            if cancelled():
+                return None
+            return self.to_qimage(background)
+        
+        def scaled(qimage):
+            if qimage is None:
+                return
+            pixmap = QPixmap.fromImage(qimage)
+            self.pixmap_cache.put(size, pixmap)
+            if self.callback:
+                self.callback(pixmap)
+            self.update_stats_label()
+        
+        self.worker.submit('resize', job, scaled)
+    
+    def resize_report(self):
+        """返回调整大小流水线的统计信息"""
+        return self.resize_stats.as_dict()
+    
+    def memory_report(self):
+        """返回各图像缓存的常驻字节数"""
+        return self.memory.report()
+    
+    @staticmethod
+    def to_qimage(background_image):
+        """将 PIL 图像转换为 QImage（可在工作线程中调用）"""
+        return pil_to_qimage(background_image)
+    
+    @staticmethod
+    def to_pixmap(background_image):
+        """将 PIL 图像转换为 QPixmap"""
+        return to_qpixmap(background_image)
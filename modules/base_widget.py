@@ -1,29 +1,139 @@
 """基础UI组件模块"""
 from PySide2.QtWidgets import QWidget
 from PySide2.QtGui import QPainter
-from PySide2.QtCore import Qt
+from PySide2.QtCore import Qt, QTimer, QElapsedTimer, QEvent
 
 class BackgroundWidget(QWidget):
-    """支持背景图片的基础部件"""
+    """支持背景图片的基础部件
+
+    背景管理器送来的图片已按部件大小缩放，覆盖部件时直接居中绘制。
+    不够大时（例如调整大小后、新图片送达前）才在此缩放：收到预览或正在等待
+    高质量图片时用快速缩放，平滑缩放由背景管理器在工作线程中完成。
+    缩放结果按部件大小缓存，普通重绘（如按钮悬停）直接绘制缓存。
+    设置动画背景后由单次定时器按帧时长切换帧，部件隐藏或窗口最小化时停止。
+    """
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.background_pixmap = None
-        
-    def setBackgroundPixmap(self, pixmap):
-        """设置背景图片"""
+        self.background_opacity = 1.0
+        self.scaled_pixmap = None  # 按当前大小缩放后的缓存
+        self.preview = False  # 当前背景是否为低质量预览
+        self.resizing = False  # 大小已改变，等待按新大小缩放的背景
+        self.animation = None
+        self.frame_pixmap = None  # 动画的当前帧
+        self.frame_index = -1
+        self.animation_clock = QElapsedTimer()
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.timeout.connect(self.advance_frame)
+        self.window_filtered = False  # 是否已监听顶层窗口的状态变化
+
+    def setBackgroundPixmap(self, pixmap, preview=False):
+        """设置背景图片，preview 表示之后还会送来高质量的版本"""
         self.background_pixmap = pixmap
+        self.preview = preview
+        if not preview:
+            self.resizing = False
+        self.scaled_pixmap = None
         self.update()
-        
-    def paintEvent(self, event):
-        """绘制背景"""
-        if self.background_pixmap:
-            painter = QPainter(self)
-            painter.setOpacity(0.5)  # 设置透明度为50%
-            scaled_pixmap = self.background_pixmap.scaled(
+
+    def setBackgroundOpacity(self, opacity):
+        """设置背景透明度（绘制时应用，不重建图片）"""
+        if opacity != self.background_opacity:
+            self.background_opacity = opacity
+            self.update()
+
+    def setAnimation(self, animation):
+        """设置动画背景（None 表示停止动画）"""
+        self.frame_timer.stop()
+        self.animation = animation
+        self.frame_pixmap = None
+        self.frame_index = -1
+        self.scaled_pixmap = None
+        if animation:
+            animation.frame_ready = self.advance_frame
+            animation.set_size(self.width(), self.height())
+            self.animation_clock.start()
+            self.advance_frame()
+        self.update()
+
+    def advance_frame(self):
+        """按经过的时间显示对应的帧，错过的帧直接跳过"""
+        if not self.animation or not self.isVisible() or self.window().isMinimized():
+            return
+        index, delay = self.animation.frame_at(self.animation_clock.elapsed())
+        if index != self.frame_index:
+            pixmap = self.animation.frame(index)
+            # 帧还没解码好时继续显示上一帧
+            if pixmap is not None:
+                self.frame_index = index
+                self.frame_pixmap = pixmap
+                self.scaled_pixmap = None
+                if pixmap.width() >= self.width() and pixmap.height() >= self.height():
+                    # 动画帧已按新大小解码，不再需要快速缩放
+                    self.resizing = False
+                self.update()
+        self.frame_timer.start(max(delay, self.animation.decoder.MIN_DURATION))
+
+    def showEvent(self, event):
+        """重新显示时恢复动画"""
+        super().showEvent(event)
+        window = self.window()
+        if window is not self and not self.window_filtered:
+            # 最小化只改变顶层窗口的状态，子部件仍然可见
+            window.installEventFilter(self)
+            self.window_filtered = True
+        if self.animation:
+            self.advance_frame()
+
+    def eventFilter(self, watched, event):
+        """顶层窗口最小化时停止动画，还原后恢复"""
+        if event.type() == QEvent.WindowStateChange and watched is self.window():
+            if watched.isMinimized():
+                self.frame_timer.stop()
+            elif self.animation:
+                self.advance_frame()
+        return super().eventFilter(watched, event)
+
+    def hideEvent(self, event):
+        """隐藏时停止动画定时器"""
+        super().hideEvent(event)
+        self.frame_timer.stop()
+
+    def resizeEvent(self, event):
+        """大小改变时使缓存失效，新背景送达前只做快速缩放"""
+        super().resizeEvent(event)
+        self.scaled_pixmap = None
+        if self.current_pixmap() is not None:
+            self.resizing = True
+
+    def current_pixmap(self):
+        """当前要绘制的图片：动画帧优先，帧未就绪时用静态背景"""
+        return self.frame_pixmap if self.frame_pixmap is not None else self.background_pixmap
+
+    def get_scaled_pixmap(self):
+        """返回覆盖当前大小的背景，等待高质量图片期间使用快速缩放"""
+        if self.scaled_pixmap is None:
+            pixmap = self.current_pixmap()
+            if pixmap.width() >= self.width() and pixmap.height() >= self.height():
+                # 背景和动画帧已按部件大小预缩放，直接居中绘制
+                self.scaled_pixmap = pixmap
+                return pixmap
+            fast = self.preview or self.resizing
+            self.scaled_pixmap = pixmap.scaled(
                 self.size(),
                 Qt.KeepAspectRatioByExpanding,
-                Qt.SmoothTransformation
+                Qt.FastTransformation if fast else Qt.SmoothTransformation
             )
+        return self.scaled_pixmap
+
+    def paintEvent(self, event):
+        """绘制背景"""
+        if self.current_pixmap() is not None:
+            painter = QPainter(self)
+            painter.setOpacity(self.background_opacity)
+            scaled_pixmap = self.get_scaled_pixmap()
             # 居中绘制
             x = (self.width() - scaled_pixmap.width()) // 2
             y = (self.height() - scaled_pixmap.height()) // 2
@@ -0,0 +1,130 @@
+"""批量计算模块
+
+不依赖 Qt，从文件或标准输入逐行读取算式，按块分发到进程池计算，
+并按输入顺序输出结果。计算语义与界面一致（CalculatorCore.evaluate_expression）。
+
+用法：
+    python -m modules.batch [输入文件 ...] [-o 输出文件] [--chunk-size N] [--workers N]
+"""
+import argparse
+import itertools
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .calculator_core import CalculatorCore
+
+# 默认每块的算式数量
+DEFAULT_CHUNK_SIZE = 2000
+
+# 每个工作进程持有一个计算器实例
+_core = None
+
+
+def evaluate_lines(lines, backend=None):
+    """计算一组算式，空行返回空字符串
+
+    backend 指定数值后端（例如与界面的计算器一致）；默认使用进程内共享的计算器。
+    """
+    global _core
+    if backend is not None:
+        core = CalculatorCore(backend)
+    else:
+        if _core is None:
+            _core = CalculatorCore()
+        core = _core
+    evaluate = core.evaluate_expression
+    return [evaluate(line) if line.strip() else "" for line in lines]
+
+
+def iter_chunks(lines, chunk_size):
+    """将行迭代器切分为列表块"""
+    lines = iter(lines)
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_stream(lines, chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+    """流式计算算式，按输入顺序逐条产出结果
+
+    最多同时提交 workers * 2 个块，避免一次性读入全部输入。
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = iter_chunks(lines, chunk_size)
+    if workers == 1:
+        for chunk in chunks:
+            yield from evaluate_lines(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in itertools.islice(chunks, workers * 2):
+            pending.append(executor.submit(evaluate_lines, chunk))
+        while pending:
+            results = pending.popleft().result()
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(executor.submit(evaluate_lines, chunk))
+            yield from results
+
+
+def _read_lines(paths, encoding):
+    """依次读取各输入文件（'-' 或未指定表示标准输入）的行"""
+    for path in paths or ['-']:
+        if path == '-':
+            stream = sys.stdin
+            if hasattr(stream, 'reconfigure'):
+                stream.reconfigure(encoding=encoding)
+            for line in stream:
+                yield line.rstrip('\r\n')
+        else:
+            with open(path, 'r', encoding=encoding) as f:
+                for line in f:
+                    yield line.rstrip('\r\n')
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog='python -m modules.batch', description="批量计算算式")
+    parser.add_argument('inputs', nargs='*', help="输入文件，每行一个算式（默认读取标准输入）")
+    parser.add_argument('-o', '--output', help="输出文件（默认写到标准输出）")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="每块的算式数量")
+    parser.add_argument('--workers', type=int, default=None, help="工作进程数（默认等于 CPU 核数）")
+    parser.add_argument('--with-expression', action='store_true', help="输出“算式<TAB>结果”")
+    parser.add_argument('--encoding', default='utf-8', help="输入输出编码")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size 必须大于 0")
+
+    lines = _read_lines(args.inputs, args.encoding)
+    if args.with_expression:
+        lines, expressions = itertools.tee(lines)
+    results = evaluate_stream(lines, args.chunk_size, args.workers)
+    if args.with_expression:
+        results = (f"{expression}\t{result}" for expression, result in zip(expressions, results))
+
+    if args.output:
+        out = open(args.output, 'w', encoding=args.encoding)
+    else:
+        out = sys.stdout
+        if hasattr(out, 'reconfigure'):
+            out.reconfigure(encoding=args.encoding)
+    try:
+        for result in results:
+            out.write(result)
+            out.write('\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,58 @@
 """计算器核心逻辑模块"""
-import math
+import struct
+from decimal import Decimal
+from fractions import Fraction
+
+from .expression_engine import compile_expression, InvalidInputError
+from .numeric_backend import FLOAT_BACKEND
+
+# 快照头：标志位、上一个数和内存的类型、两者的浮点值，
+# 以及当前数、运算符、结果、上一个数、内存五段文本的字节数
+_SNAPSHOT = struct.Struct('<BBBdd5I')
+_NEW_NUMBER, _DECIMAL_PRESSED, _HAS_MEMORY, _NO_OPERATION = (1 << i for i in range(4))
+
+# 数字的类型标记；float 按二进制保存，其余按文本精确保存
+_NONE, _FLOAT, _INT, _DECIMAL, _FRACTION = range(5)
+_TEXT_KINDS = {int: _INT, Decimal: _DECIMAL, Fraction: _FRACTION}
+_TEXT_TYPES = {kind: cls for cls, kind in _TEXT_KINDS.items()}
+
+
+def _pack_number(value):
+    """数字 -> (类型标记, 浮点值, 文本)"""
+    if value is None:
+        return _NONE, 0.0, b''
+    kind = _TEXT_KINDS.get(type(value))
+    if kind is None:
+        return _FLOAT, float(value), b''
+    return kind, 0.0, str(value).encode('ascii')
+
+
+def _unpack_number(kind, value, text):
+    if kind == _NONE:
+        return None
+    if kind == _FLOAT:
+        return value
+    if kind in _TEXT_TYPES:
+        try:
+            return _TEXT_TYPES[kind](str(text, 'ascii'))
+        except ArithmeticError:
+            # 无效文本时 Decimal 抛出的是 InvalidOperation
+            raise ValueError("无效的数字文本") from None
+    raise ValueError("未知的数字类型")
+
 
 class CalculatorCore:
-    """计算器核心类"""
-    def __init__(self):
+    """计算器核心类
+
+    backend 为数值后端（见 numeric_backend），默认使用二进制浮点。
+    状态保存在 __slots__ 中，大量会话同时存在时每个实例只占少量内存；
+    snapshot() / restore() 把状态与紧凑的字节串互相转换。
+    """
+    __slots__ = ('backend', 'current_num', 'previous_num', 'operation', 'result',
+                 'new_number', 'decimal_pressed', 'memory', 'has_memory')
+
+    def __init__(self, backend=None):
+        self.backend = backend or FLOAT_BACKEND
         self.reset()
         self.memory = 0
         self.has_memory = False
@@ -17,6 +66,49 @@ class CalculatorCore:
         self.new_number = True
         self.decimal_pressed = False
     
+    def snapshot(self):
+        """把状态打包为字节串（不包含数值后端）"""
+        flags = ((_NEW_NUMBER if self.new_number else 0)
+                 | (_DECIMAL_PRESSED if self.decimal_pressed else 0)
+                 | (_HAS_MEMORY if self.has_memory else 0)
+                 | (_NO_OPERATION if self.operation is None else 0))
+        previous_kind, previous_value, previous_text = _pack_number(self.previous_num)
+        memory_kind, memory_value, memory_text = _pack_number(self.memory)
+        current = self.current_num.encode('utf-8')
+        operation = (self.operation or "").encode('utf-8')
+        result = self.result.encode('utf-8')
+        header = _SNAPSHOT.pack(flags, previous_kind, memory_kind, previous_value, memory_value,
+                                len(current), len(operation), len(result),
+                                len(previous_text), len(memory_text))
+        return b''.join((header, current, operation, result, previous_text, memory_text))
+
+    def restore(self, data):
+        """从 snapshot() 的结果恢复状态，数据不完整时抛出 ValueError"""
+        data = memoryview(data)
+        if len(data) < _SNAPSHOT.size:
+            raise ValueError("快照数据不完整")
+        (flags, previous_kind, memory_kind, previous_value, memory_value,
+         *lengths) = _SNAPSHOT.unpack_from(data)
+        if _SNAPSHOT.size + sum(lengths) != len(data):
+            raise ValueError("快照数据不完整")
+        texts = []
+        offset = _SNAPSHOT.size
+        for length in lengths:
+            texts.append(data[offset:offset + length])
+            offset += length
+        current, operation, result, previous_text, memory_text = texts
+        # 先全部解析，出错时不改变当前状态
+        previous_num = _unpack_number(previous_kind, previous_value, previous_text)
+        memory = _unpack_number(memory_kind, memory_value, memory_text)
+        self.current_num = str(current, 'utf-8')
+        self.operation = None if flags & _NO_OPERATION else str(operation, 'utf-8')
+        self.result = str(result, 'utf-8')
+        self.previous_num = previous_num
+        self.memory = memory
+        self.new_number = bool(flags & _NEW_NUMBER)
+        self.decimal_pressed = bool(flags & _DECIMAL_PRESSED)
+        self.has_memory = bool(flags & _HAS_MEMORY)
+
     def clear_entry(self):
         """清除当前输入"""
         self.current_num = "0"
@@ -64,7 +156,7 @@ class CalculatorCore:
         """处理运算符按键"""
         if self.previous_num is not None and not self.new_number:
             self.calculate()
-        self.previous_num = float(self.current_num)
+        self.previous_num = self.backend.parse(self.current_num)
         self.operation = op
         self.new_number = True
         self.decimal_pressed = False
@@ -74,17 +166,18 @@ class CalculatorCore:
         """执行计算"""
         if self.previous_num is not None and self.operation:
             try:
-                current = float(self.current_num)
+                backend = self.backend
+                current = backend.parse(self.current_num)
                 if self.operation == '+':
-                    result = self.previous_num + current
+                    result = backend.add(self.previous_num, current)
                 elif self.operation == '-':
-                    result = self.previous_num - current
+                    result = backend.subtract(self.previous_num, current)
                 elif self.operation == '×':
-                    result = self.previous_num * current
+                    result = backend.multiply(self.previous_num, current)
                 elif self.operation == '÷':
                     if current == 0:
                         return "除数不能为零"
-                    result = self.previous_num / current
+                    result = backend.divide(self.previous_num, current)
                 
                 self.result = self.format_number(result)
                 self.current_num = self.result
@@ -98,40 +191,60 @@ class CalculatorCore:
                 return "错误"
         return self.format_number(self.current_num)
     
+    def evaluate_expression(self, expression):
+        """计算完整算式（按运算符优先级），结果作为当前数"""
+        try:
+            value = compile_expression(expression, self.backend)()
+        except ZeroDivisionError:
+            return "除数不能为零"
+        except InvalidInputError:
+            return "无效输入"
+        except Exception:
+            return "错误"
+        
+        self.result = self.format_number(value)
+        self.current_num = self.result
+        self.previous_num = None
+        self.operation = None
+        self.new_number = True
+        self.decimal_pressed = '.' in self.result
+        return self.result
+    
     def special_operation(self, op):
         """处理特殊运算"""
         try:
-            num = float(self.current_num)
+            backend = self.backend
+            num = backend.parse(self.current_num)
             
             if op == '%':
                 # 如果在运算过程中按下%，将当前数作为百分比计算
                 if self.previous_num is not None and self.operation:
-                    percent_value = num / 100
+                    percent_value = backend.divide(num, 100)
                     if self.operation == '+' or self.operation == '-':
                         # 加减法中，百分比相对于第一个数计算
-                        result = self.previous_num * percent_value
+                        result = backend.multiply(self.previous_num, percent_value)
                     else:
                         # 乘除法中，直接用百分比值计算
                         result = percent_value
                 else:
                     # 单独使用%时，计算百分比值
-                    result = num / 100
+                    result = backend.divide(num, 100)
             
             elif op == '±':
-                result = -num
+                result = backend.negate(num)
             
             elif op == 'x²':
-                result = num * num
+                result = backend.multiply(num, num)
             
             elif op == '√':
                 if num < 0:
                     return "无效输入"
-                result = math.sqrt(num)
+                result = backend.sqrt(num)
             
             elif op == '1/x':
                 if num == 0:
                     return "除数不能为零"
-                result = 1 / num
+                result = backend.reciprocal(num)
             
             # 格式化结果
             self.result = self.format_number(result)
@@ -155,18 +268,18 @@ class CalculatorCore:
             self.memory = 0
             self.has_memory = False
         elif op == 'MR':  # Memory Recall
-            self.current_num = str(self.memory)
+            self.current_num = self.format_number(self.memory)
             self.new_number = True
         elif op == 'M+':  # Memory Add
-            self.memory += float(self.current_num)
+            self.memory = self.backend.add(self.memory, self.backend.parse(self.current_num))
             self.has_memory = True
             self.new_number = True
         elif op == 'M-':  # Memory Subtract
-            self.memory -= float(self.current_num)
+            self.memory = self.backend.subtract(self.memory, self.backend.parse(self.current_num))
             self.has_memory = True
             self.new_number = True
         elif op == 'MS':  # Memory Store
-            self.memory = float(self.current_num)
+            self.memory = self.backend.parse(self.current_num)
             self.has_memory = True
             self.new_number = True
         
@@ -179,20 +292,7 @@ class CalculatorCore:
             if isinstance(num, str) and not num.replace('.', '').isdigit():
                 return num
             
-            # 转换为浮点数
-            float_num = float(num)
-            
-            # 如果是整数，返回整数字符串
-            if float_num.is_integer():
-                return str(int(float_num))
-            
-            # 处理小数，去除尾部多余的0
-            str_num = f"{float_num:.12g}"
-            
-            # 如果数字很大或很小，使用科学计数法
-            if 'e' in str_num:
-                return str_num
-            
-            return str_num
+            # 由数值后端格式化：整数不显示小数点，小数去除尾部多余的0
+            return self.backend.format(num)
         except:
             return str(num)
@@ -1,24 +1,46 @@
 """计算器UI模块"""
 from PySide2.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, 
                            QPushButton, QLabel, QFrame, QGridLayout,
-                           QMenu, QApplication, QLineEdit)
+                           QMenu, QApplication, QLineEdit, QStyle,
+                           QSystemTrayIcon)
 from PySide2.QtCore import Qt, QTimer, QObject, QEvent
-from PySide2.QtGui import QFont, QImage, QPixmap
+from PySide2.QtGui import QFont, QPixmap
 from .base_widget import BackgroundWidget
-from .background_manager import BackgroundManager
 from .keyboard_handler import KeyboardHandler
 from .history_manager import HistoryManager
+from .settings_store import SettingsStore
 
 class CalculatorUI(QMainWindow):
     """计算器UI类"""
-    def __init__(self, button_callback, memory_callback):
+    # 显示更新合并的间隔（毫秒），约一帧
+    DISPLAY_INTERVAL = 16
+    
+    def __init__(self, button_callback, memory_callback, undo_callback=None, redo_callback=None,
+                 paste_callback=None):
         super().__init__()
         self.button_callback = button_callback
         self.memory_callback = memory_callback
-        self.background_manager = BackgroundManager()
+        self.undo_callback = undo_callback
+        self.redo_callback = redo_callback
+        self.paste_callback = paste_callback  # 整体处理粘贴的文本
+        self.settings = SettingsStore()
+        self.background_manager = None  # 第一帧绘制后再创建，启动时不导入 PIL
+        self.restored_background = None  # 会话快照恢复的背景：(原图路径, 窗口大小)
+        # 第一帧绘制完成后执行的回调
+        self.first_paint_callbacks = [self.init_background]
+        self.tray_icon = None  # 常驻托盘时关闭窗口只隐藏
         self.history_manager = HistoryManager()
         self.history_manager.set_expression_select_callback(self.handle_history_expression)
         
+        # 显示更新先记录下来，每帧最多应用一次；None 表示不改变
+        self.pending_expression = None
+        self.pending_result = None
+        self.pending_records = []  # 待写入历史记录的 (表达式, 结果)
+        self.display_timer = QTimer(self)
+        self.display_timer.setSingleShot(True)
+        self.display_timer.setInterval(self.DISPLAY_INTERVAL)
+        self.display_timer.timeout.connect(self.flush_display)
+        
         # 设置窗口属性
         self.setWindowTitle("计算器")
         self.setMinimumSize(400, 600)
@@ -26,6 +48,7 @@ class CalculatorUI(QMainWindow):
         # 创建背景部件
         self.background_widget = BackgroundWidget(self)
         self.setCentralWidget(self.background_widget)
+        self.background_widget.setBackgroundOpacity(self.settings.get('opacity'))
         
         # 创建主布局
         main_layout = QVBoxLayout(self.background_widget)
@@ -68,7 +91,7 @@ class CalculatorUI(QMainWindow):
         # 添加设置按钮（左侧）
         settings_button = QPushButton("⚙")
         settings_button.setFixedSize(40, 40)
-        settings_button.clicked.connect(lambda: self.background_manager.show_settings(self))
+        settings_button.clicked.connect(lambda: self.init_background().show_settings(self))
         title_bar.addWidget(settings_button)
         
         title_bar.addStretch()  # 添加弹性空间
@@ -121,7 +144,8 @@ class CalculatorUI(QMainWindow):
         main_layout.addWidget(display_frame)
         
         # 初始化键盘处理器（确保在创建完expression_display后初始化）
-        self.keyboard_handler = KeyboardHandler(self.button_callback, self.expression_display)
+        self.keyboard_handler = KeyboardHandler(self.button_callback, self.expression_display,
+                                               self.undo_callback, self.redo_callback)
         
         # 创建内存按钮区域
         memory_layout = QHBoxLayout()
@@ -175,11 +199,10 @@ class CalculatorUI(QMainWindow):
         
         main_layout.addLayout(button_grid)
         
-        # 设置背景管理器的回调
-        self.background_manager.set_callback(self.update_background)
-        
         # 安装事件过滤器
         self.installEventFilter(self)
+        # 监听第一次绘制
+        self.background_widget.installEventFilter(self)
 
     def create_button_callback(self, text):
         """创建按钮回调函数"""
@@ -194,13 +217,63 @@ class CalculatorUI(QMainWindow):
         return callback
     
     def update_display(self, expression, result):
-        """更新显示内容"""
-        self.expression_display.setText(expression)
+        """更新显示内容（下一帧统一应用）"""
+        self.pending_expression = expression
         if result:  # 只有在有结果时才更新结果显示
-            self.result_label.setText(result)
+            self.pending_result = result
         # 添加到历史记录
         if expression and result and ('=' in expression or expression.startswith(('pow', '√', '1/'))):
-            self.history_manager.add_record(expression, result)
+            self.pending_records.append((expression, result))
+        self.schedule_display()
+    
+    def set_display(self, expression, result):
+        """设置表达式和结果显示（下一帧统一应用），不写入历史记录"""
+        self.pending_expression = expression
+        self.pending_result = result
+        self.schedule_display()
+    
+    def show_results(self, records, shown=None):
+        """显示批量计算的结果：(表达式, 结果) 全部写入历史记录，显示 shown（默认最后一条）"""
+        if shown is None:
+            if not records:
+                return
+            shown = records[-1]
+        expression, result = shown
+        self.pending_expression = expression
+        if result:
+            self.pending_result = result
+        self.pending_records.extend(records)
+        self.schedule_display()
+    
+    def schedule_display(self):
+        """安排一次显示更新；已安排时不重新计时，连续输入时也保持每帧一次"""
+        if not self.display_timer.isActive():
+            self.display_timer.start()
+    
+    def flush_display(self):
+        """立即应用待更新的显示内容和历史记录"""
+        self.display_timer.stop()
+        if self.pending_expression is not None:
+            self.expression_display.setText(self.pending_expression)
+            self.pending_expression = None
+        if self.pending_result is not None:
+            self.result_label.setText(self.pending_result)
+            self.pending_result = None
+        if self.pending_records:
+            records, self.pending_records = self.pending_records, []
+            self.history_manager.add_records(records)
+    
+    def expression_text(self):
+        """当前的表达式内容（包括尚未应用的更新）"""
+        if self.pending_expression is not None:
+            return self.pending_expression
+        return self.expression_display.text()
+    
+    def result_text(self):
+        """当前的结果内容（包括尚未应用的更新）"""
+        if self.pending_result is not None:
+            return self.pending_result
+        return self.result_label.text()
     
     def update_memory_indicator(self, has_memory):
         """更新内存指示器显示状态"""
@@ -209,18 +282,42 @@ class CalculatorUI(QMainWindow):
         else:
             self.memory_indicator.hide()
     
-    def update_background(self, background_image=None):
-        """更新背景图片"""
-        if background_image:
-            # 从PIL Image转换为QImage
-            img_data = background_image.tobytes('raw', 'RGBA')
-            qimage = QImage(img_data, background_image.width, background_image.height, QImage.Format.Format_RGBA8888)
-            
-            # 转换为QPixmap并设置给背景部件
-            pixmap = QPixmap.fromImage(qimage)
-            self.background_widget.setBackgroundPixmap(pixmap)
-        else:
+    def update_background(self, background=None, preview=False):
+        """更新背景图片（QPixmap 或 PIL Image），preview 表示低质量预览"""
+        if background is None:
             self.background_widget.setBackgroundPixmap(None)
+        elif isinstance(background, QPixmap):
+            self.background_widget.setBackgroundPixmap(background, preview)
+        else:
+            # 从PIL Image转换为QPixmap并设置给背景部件
+            pixmap = self.background_manager.to_pixmap(background)
+            self.background_widget.setBackgroundPixmap(pixmap)
+    
+    def refresh_background(self, width, height):
+        """按窗口大小请求背景，结果异步送到 update_background"""
+        if self.background_manager is not None:
+            self.background_manager.request_background(width, height)
+    
+    def init_background(self):
+        """创建背景管理器，并按当前窗口大小恢复背景"""
+        if self.background_manager is None:
+            from .background_manager import BackgroundManager
+            self.background_manager = BackgroundManager(self.settings)
+            self.background_manager.set_callback(self.update_background)
+            self.background_manager.set_opacity_callback(self.background_widget.setBackgroundOpacity)
+            self.background_manager.set_animation_callback(self.background_widget.setAnimation)
+            if self.restored_background is not None:
+                path, size = self.restored_background
+                self.background_manager.seed_pixmap(path, size, self.background_widget.background_pixmap)
+                self.restored_background = None
+            self.refresh_background(self.width(), self.height())
+        return self.background_manager
+    
+    def after_first_paint(self):
+        """第一帧绘制完成后执行推迟的初始化"""
+        callbacks, self.first_paint_callbacks = self.first_paint_callbacks, []
+        for callback in callbacks:
+            callback()
     
     def show_context_menu(self, position):
         """显示右键菜单"""
@@ -243,6 +340,7 @@ class CalculatorUI(QMainWindow):
     
     def copy_text(self, label):
         """复制文本到剪贴板"""
+        self.flush_display()
         text = label.text()
         if text:
             QApplication.clipboard().setText(text)
@@ -250,16 +348,62 @@ class CalculatorUI(QMainWindow):
     def paste_text(self):
         """从剪贴板粘贴文本"""
         text = QApplication.clipboard().text()
-        if text:
-            # 尝试将粘贴的文本作为按钮输入处理
-            for char in text:
-                if char.isdigit() or char in ['+', '-', '×', '÷', '.', '=']:
-                    self.button_callback(char)
+        if not text:
+            return
+        if self.paste_callback is not None:
+            self.paste_callback(text)
+            return
+        # 没有整体处理粘贴的回调时，逐个字符作为按钮输入处理
+        for char in text:
+            if char.isdigit() or char in ['+', '-', '×', '÷', '.', '=']:
+                self.button_callback(char)
+    
+    def enable_tray(self):
+        """常驻系统托盘：关闭窗口时隐藏到托盘，托盘菜单可以显示窗口或退出"""
+        if not QSystemTrayIcon.isSystemTrayAvailable():
+            return False
+        app = QApplication.instance()
+        self.tray_icon = QSystemTrayIcon(app.style().standardIcon(QStyle.SP_ComputerIcon), self)
+        self.tray_icon.setToolTip("计算器")
+        menu = QMenu(self)
+        menu.addAction("显示", self.activate)
+        menu.addAction("退出", app.quit)
+        self.tray_icon.setContextMenu(menu)
+        self.tray_icon.activated.connect(self.tray_activated)
+        self.tray_icon.show()
+        app.setQuitOnLastWindowClosed(False)
+        return True
+    
+    def tray_activated(self, reason):
+        """单击托盘图标时显示或隐藏窗口"""
+        if reason == QSystemTrayIcon.Trigger:
+            if self.isVisible():
+                self.hide()
+            else:
+                self.activate()
+    
+    def activate(self):
+        """显示窗口并移到最前"""
+        self.showNormal()
+        self.raise_()
+        self.activateWindow()
+    
+    def closeEvent(self, event):
+        """常驻托盘时关闭窗口只隐藏"""
+        if self.tray_icon is not None:
+            event.ignore()
+            self.hide()
+        else:
+            super().closeEvent(event)
     
     def keyPressEvent(self, event):
         """处理主窗口的按键事件"""
         # 在显示模式下处理按键输入
         if not self.expression_input.isVisible():
+            # Enter 和复制会读取显示内容，先应用待更新的显示
+            if event.key() in [Qt.Key_Return, Qt.Key_Enter, Qt.Key_Equal] or (
+                    event.key() == Qt.Key_C and event.modifiers() == Qt.ControlModifier):
+                self.flush_display()
             # 如果keyboard_handler没有处理按键，则尝试处理复制粘贴
             if not self.keyboard_handler.handle_key_press(event):
                 if event.key() == Qt.Key_C and event.modifiers() == Qt.ControlModifier:
@@ -268,7 +412,7 @@ class CalculatorUI(QMainWindow):
                     else:
                         self.copy_text(self.expression_display)
                 elif event.key() == Qt.Key_V and event.modifiers() == Qt.ControlModifier:
-                    self.paste_from_clipboard()
+                    self.paste_text()
         
         # 在输入模式下，Enter键结束输入并计算
         elif event.key() in [Qt.Key_Return, Qt.Key_Enter]:
@@ -278,6 +422,12 @@ class CalculatorUI(QMainWindow):
 
     def eventFilter(self, obj, event):
         """事件过滤器，处理输入控件的焦点丢失事件和按键事件"""
+        if obj is self.background_widget:
+            if event.type() == QEvent.Paint:
+                # 只需要第一次绘制，等这一帧画完再执行推迟的初始化
+                self.background_widget.removeEventFilter(self)
+                QTimer.singleShot(0, self.after_first_paint)
+            return False
         if obj == self.expression_input:
             if event.type() == QEvent.FocusOut:
                 self.finish_input(calculate=False)  # 失去焦点时不计算
@@ -300,6 +450,7 @@ class CalculatorUI(QMainWindow):
 
     def finish_input(self, calculate=False):
         """完成输入"""
+        self.flush_display()
         if self.expression_input.isVisible():
             text = self.expression_input.text()
             if text:  # 只有在有输入内容时才更新显示
@@ -309,6 +460,7 @@ class CalculatorUI(QMainWindow):
                     # 先发送表达式进行计算
                     self.button_callback(text + "=")
                     # 然后更新显示
+                    self.flush_display()
                     self.expression_display.setText(text)
                 else:
                     self.expression_display.setText(text)
@@ -319,6 +471,7 @@ class CalculatorUI(QMainWindow):
             return
         
         # 获取当前表达式和结果
+        self.flush_display()
         text = self.expression_display.text()
         result = self.result_label.text()
         
@@ -362,25 +515,23 @@ class CalculatorUI(QMainWindow):
 
     def clear_all_display(self):
         """清除所有显示内容"""
-        self.expression_display.clear()
         self.expression_input.clear()
-        self.result_label.clear()
+        self.set_display("", "")
 
     def clear_result(self):
         """清除结果显示"""
-        self.result_label.clear()
+        self.pending_result = ""
+        self.schedule_display()
 
     def resizeEvent(self, event):
         """窗口大小改变时更新背景"""
         super().resizeEvent(event)
-        if hasattr(self.background_manager, 'current_background'):
-            size = event.size()
-            bg_image = self.background_manager.get_background(size.width(), size.height())
-            if bg_image:
-                self.update_background(bg_image)
+        size = event.size()
+        self.refresh_background(size.width(), size.height())
 
     def handle_history_expression(self, expression):
         """处理从历史记录中选择的表达式"""
+        self.flush_display()
         # 切换到输入模式并设置表达式
         self.expression_display.hide()
         self.expression_input.show()
@@ -0,0 +1,213 @@
+"""本地计算服务模块
+
+不依赖 Qt，让其他工具通过本地套接字使用与界面完全一致的计算语义
+（format_number 的输出、special_operation 的百分比规则等）。
+
+协议为按行分隔的 JSON，一个连接上可以连续发送多个请求（流水线），
+响应按请求顺序返回：
+    请求：{"id": 1, "session": "a", "method": "evaluate_expression", "args": ["1+2×3"]}
+    响应：{"id": 1, "result": "7"}  或  {"id": 1, "error": "未知的方法"}
+
+session 相同的请求共享一个 CalculatorCore；不指定时每个连接使用自己的会话。
+长时间未使用的会话会被回收。较长的算式交给线程池计算，不阻塞其他连接。
+
+用法：
+    python -m modules.eval_service [--unix 路径 | --host 127.0.0.1 --port 8765]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+from .calculator_core import CalculatorCore
+from .numeric_backend import create_backend
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# 允许调用的 CalculatorCore 方法 -> 参数个数
+METHODS = {
+    'number_press': 1,
+    'decimal_press': 0,
+    'operation_press': 1,
+    'calculate': 0,
+    'evaluate_expression': 1,
+    'special_operation': 1,
+    'memory_operation': 1,
+    'backspace': 0,
+    'clear_entry': 0,
+    'clear_all': 0,
+    'format_number': 1,
+}
+# 参数长度超过该值时交给线程池计算
+OFFLOAD_LENGTH = 256
+# 写缓冲区超过该字节数时等待对端读取
+WRITE_HIGH_WATER = 64 * 1024
+# 一行请求的最大字节数，超过时整行丢弃并返回错误
+MAX_LINE = 1024 * 1024
+
+
+class Session:
+    """一个客户端会话"""
+    __slots__ = ('core', 'lock', 'last_used')
+
+    def __init__(self, core):
+        self.core = core
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class SessionPool:
+    """会话池：按最近使用排序，回收空闲超时和超出数量上限的会话"""
+    def __init__(self, idle_timeout=300, max_sessions=10000, backend='float'):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.backend = create_backend(backend)
+        self.sessions = OrderedDict()
+
+    def get(self, session_id):
+        """返回会话，不存在时创建"""
+        now = time.monotonic()
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(CalculatorCore(self.backend))
+        else:
+            self.sessions.move_to_end(session_id)
+        session.last_used = now
+        self.evict(now)
+        return session
+
+    def evict(self, now=None):
+        """回收空闲超时的会话；最久未用的会话在最前面，检查到未超时的即可停止"""
+        now = time.monotonic() if now is None else now
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if len(self.sessions) <= self.max_sessions and now - session.last_used < self.idle_timeout:
+                break
+            del self.sessions[session_id]
+
+    def discard(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class EvalService:
+    """按行分隔 JSON 的计算服务"""
+    def __init__(self, pool=None, executor=None):
+        self.pool = pool or SessionPool()
+        self.executor = executor or ThreadPoolExecutor()
+        self.connection_ids = count(1)
+
+    async def handle_connection(self, reader, writer):
+        """处理一个连接上的所有请求"""
+        connection_session = f"connection-{next(self.connection_ids)}"
+        try:
+            while True:
+                line = await self.read_line(reader)
+                if line is None:
+                    response = {'id': None, 'error': "请求过长"}
+                elif not line:
+                    break
+                elif not line.strip():
+                    continue
+                else:
+                    response = await self.handle_line(line, connection_session)
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                # 只在写缓冲区积压时等待，流水线上的多个响应合并发送
+                if writer.transport.get_write_buffer_size() > WRITE_HIGH_WATER:
+                    await writer.drain()
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.pool.discard(connection_session)
+            writer.close()
+
+    @staticmethod
+    async def read_line(reader):
+        """读取一行请求，连接关闭时返回 b''
+
+        超过流的长度上限的行被整行丢弃并返回 None，之后的请求照常处理。
+        """
+        oversized = False
+        while True:
+            try:
+                line = await reader.readuntil(b'\n')
+            except asyncio.IncompleteReadError as e:
+                line = e.partial  # 连接关闭前没有换行符的最后一行
+            except asyncio.LimitOverrunError as e:
+                # 丢弃缓冲区中已检查过的部分，继续寻找这一行的结尾
+                await reader.readexactly(e.consumed)
+                oversized = True
+                continue
+            return None if oversized else line
+
+    async def handle_line(self, line, default_session):
+        """解析并执行一个请求，返回响应对象"""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {'id': None, 'error': "无效的请求"}
+        if not isinstance(request, dict):
+            return {'id': None, 'error': "无效的请求"}
+        request_id = request.get('id')
+        method = request.get('method')
+        args = request.get('args', [])
+        if method not in METHODS:
+            return {'id': request_id, 'error': "未知的方法"}
+        if not isinstance(args, list) or len(args) != METHODS[method]:
+            return {'id': request_id, 'error': "参数个数错误"}
+
+        session = self.pool.get(str(request.get('session', default_session)))
+        call = getattr(session.core, method)
+        async with session.lock:
+            try:
+                if any(isinstance(arg, str) and len(arg) > OFFLOAD_LENGTH for arg in args):
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(self.executor, call, *args)
+                else:
+                    result = call(*args)
+            except Exception as e:
+                # 核心方法的异常（如空输入时按运算符）只影响这一个请求
+                return {'id': request_id, 'error': str(e)}
+        return {'id': request_id, 'result': result}
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """启动服务并一直运行"""
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path, limit=MAX_LINE)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog='python -m modules.eval_service', description="本地计算服务")
+    parser.add_argument('--unix', metavar='PATH', help="监听 Unix 套接字（默认监听 TCP）")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="监听地址")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument('--idle-timeout', type=float, default=300, help="会话空闲多少秒后回收")
+    parser.add_argument('--max-sessions', type=int, default=10000, help="最多保留的会话数")
+    parser.add_argument('--backend', default='float', help="数值后端（float / decimal / fraction）")
+    parser.add_argument('--workers', type=int, default=None, help="计算长算式的线程数")
+    args = parser.parse_args(argv)
+
+    pool = SessionPool(args.idle_timeout, args.max_sessions, args.backend)
+    service = EvalService(pool, ThreadPoolExecutor(args.workers))
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""表达式引擎模块
+
+将算式文本解析为语法树并编译为可重复调用的求值函数。
+支持运算符优先级、括号、一元正负号、百分号、平方与开方，
+编译结果按规范化后的表达式文本和数值后端缓存（LRU）。
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from .numeric_backend import FLOAT_BACKEND
+
+# 语法树节点
+Number = namedtuple('Number', 'value text')
+Variable = namedtuple('Variable', 'name')
+Unary = namedtuple('Unary', 'op operand')
+Binary = namedtuple('Binary', 'op left right')
+Percent = namedtuple('Percent', 'operand')
+Call = namedtuple('Call', 'name argument')
+
+# 编译缓存容量
+CACHE_SIZE = 1024
+
+# 输入字符到内部运算符的映射
+_NORMALIZE_TABLE = str.maketrans({
+    '*': '×',
+    '/': '÷',
+    '（': '(',
+    '）': ')',
+    '−': '-',
+})
+
+_TOKEN_RE = re.compile(r"""
+    (?P<number>(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>[-+×÷%²√()])
+""", re.VERBOSE)
+
+# 支持的函数：pow(x) 表示平方（与界面显示一致），√ 表示开方
+FUNCTIONS = ('pow', 'sqrt', '√')
+
+
+class ExpressionError(ValueError):
+    """表达式无法解析"""
+
+
+class InvalidInputError(ArithmeticError):
+    """运算输入无效（如负数开方）"""
+
+
+def normalize(text):
+    """规范化表达式文本：统一运算符、去除空白和末尾等号"""
+    text = ''.join(text.translate(_NORMALIZE_TABLE).split())
+    return text.rstrip('=')
+
+
+def tokenize(text):
+    """将规范化后的表达式切分为 (类型, 值) 记号列表"""
+    tokens = []
+    pos = 0
+    length = len(text)
+    while pos < length:
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise ExpressionError(f"无法识别的字符: {text[pos]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """递归下降解析器
+
+    expr    := term (('+' | '-') term)*
+    term    := unary (('×' | '÷') unary)*
+    unary   := ('+' | '-' | '√') unary | postfix
+    postfix := primary ('%' | '²')*
+    primary := NUMBER | NAME '(' expr ')' | NAME | '(' expr ')'
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None)
+
+    def advance(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        kind, token = self.advance()
+        if token != value:
+            raise ExpressionError(f"缺少 {value!r}")
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("空表达式")
+        node = self.expr()
+        if self.pos != len(self.tokens):
+            raise ExpressionError(f"多余的记号: {self.peek()[1]!r}")
+        return node
+
+    def expr(self):
+        node = self.term()
+        while self.peek()[1] in ('+', '-'):
+            op = self.advance()[1]
+            node = Binary(op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek()[1] in ('×', '÷'):
+            op = self.advance()[1]
+            node = Binary(op, node, self.unary())
+        return node
+
+    def unary(self):
+        token = self.peek()[1]
+        if token in ('+', '-'):
+            self.advance()
+            return Unary(token, self.unary())
+        if token == '√':
+            self.advance()
+            return Call('√', self.unary())
+        return self.postfix()
+
+    def postfix(self):
+        node = self.primary()
+        while True:
+            token = self.peek()[1]
+            if token == '%':
+                self.advance()
+                node = Percent(node)
+            elif token == '²':
+                self.advance()
+                node = Call('pow', node)
+            else:
+                return node
+
+    def primary(self):
+        kind, token = self.advance()
+        if kind == 'number':
+            return Number(float(token), token)
+        if kind == 'name':
+            if self.peek()[1] == '(':
+                if token not in FUNCTIONS:
+                    raise ExpressionError(f"未知函数: {token}")
+                self.advance()
+                argument = self.expr()
+                self.expect(')')
+                return Call('√' if token == 'sqrt' else token, argument)
+            return Variable(token)
+        if token == '(':
+            node = self.expr()
+            self.expect(')')
+            return node
+        raise ExpressionError("表达式不完整" if kind is None else f"意外的记号: {token!r}")
+
+
+def parse(text):
+    """解析表达式文本，返回语法树"""
+    return _Parser(tokenize(normalize(text))).parse()
+
+
+def variables_of(node):
+    """返回语法树中出现的变量名集合（用栈遍历，长算式不会超出递归深度）"""
+    names = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        kind = type(node)
+        if kind is Variable:
+            names.add(node.name)
+        elif kind is Binary:
+            stack.append(node.left)
+            stack.append(node.right)
+        elif kind in (Unary, Percent):
+            stack.append(node.operand)
+        elif kind is Call:
+            stack.append(node.argument)
+    return names
+
+
+def _compile_node(node, backend):
+    """将语法树节点编译为 evaluator(env) 闭包，数值运算由 backend 完成"""
+    kind = type(node)
+    if kind is Number:
+        value = backend.parse(node.text)
+        return lambda env: value
+    if kind is Variable:
+        name = node.name
+        return lambda env: env[name]
+    if kind is Unary:
+        operand = _compile_node(node.operand, backend)
+        if node.op == '-':
+            negate = backend.negate
+            return lambda env: negate(operand(env))
+        return operand
+
+    divide = backend.divide
+    multiply = backend.multiply
+    hundred = backend.parse('100')
+    if kind is Percent:
+        operand = _compile_node(node.operand, backend)
+        return lambda env: divide(operand(env), hundred)
+    if kind is Call:
+        argument = _compile_node(node.argument, backend)
+        if node.name == 'pow':
+            def square(env):
+                value = argument(env)
+                return multiply(value, value)
+            return square
+
+        sqrt = backend.sqrt
+
+        def square_root(env):
+            value = argument(env)
+            if value < 0:
+                raise InvalidInputError("负数不能开方")
+            return sqrt(value)
+        return square_root
+
+    combines = {
+        '+': backend.add,
+        '-': backend.subtract,
+        '×': multiply,
+        '÷': divide,
+    }
+    # 沿左侧展开左结合的运算链（如 1+2+3+…），逐项累积计算，
+    # 很长的算式也不会超出递归深度
+    chain = []
+    while type(node) is Binary:
+        chain.append(node)
+        node = node.left
+    first = _compile_node(node, backend)
+    steps = []
+    for binary in reversed(chain):
+        # 加减法中，百分比相对于第一个数计算（与 CalculatorCore.special_operation 一致）
+        percent = binary.op in ('+', '-') and type(binary.right) is Percent
+        right = binary.right.operand if percent else binary.right
+        steps.append((combines[binary.op], _compile_node(right, backend), percent))
+
+    if len(steps) == 1:
+        combine, right, percent = steps[0]
+        if percent:
+            def apply_percent(env):
+                base = first(env)
+                return combine(base, multiply(base, divide(right(env), hundred)))
+            return apply_percent
+        return lambda env: combine(first(env), right(env))
+
+    def apply_chain(env):
+        value = first(env)
+        for combine, right, percent in steps:
+            if percent:
+                value = combine(value, multiply(value, divide(right(env), hundred)))
+            else:
+                value = combine(value, right(env))
+        return value
+    return apply_chain
+
+
+class CompiledExpression:
+    """编译后的表达式，可重复求值"""
+    __slots__ = ('text', 'tree', 'backend', 'variables', '_evaluator')
+
+    def __init__(self, text, tree, backend=FLOAT_BACKEND):
+        self.text = text
+        self.tree = tree
+        self.backend = backend
+        self.variables = frozenset(variables_of(tree))
+        self._evaluator = _compile_node(tree, backend)
+
+    def __call__(self, **variables):
+        """求值，除零抛出 ZeroDivisionError，无效输入抛出 InvalidInputError"""
+        return self._evaluator(variables)
+
+    def __repr__(self):
+        return f"CompiledExpression({self.text!r})"
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile_normalized(text, backend):
+    return CompiledExpression(text, _Parser(tokenize(text)).parse(), backend)
+
+
+def compile_expression(text, backend=FLOAT_BACKEND):
+    """编译表达式（结果按规范化文本和数值后端缓存）"""
+    return _compile_normalized(normalize(text), backend)
+
+
+def evaluate(text, backend=FLOAT_BACKEND, **variables):
+    """编译并计算表达式"""
+    return compile_expression(text, backend)(**variables)
+
+
+def cache_info():
+    """返回编译缓存的统计信息"""
+    return _compile_normalized.cache_info()
+
+
+def clear_cache():
+    """清空编译缓存"""
+    _compile_normalized.cache_clear()
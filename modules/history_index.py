@@ -0,0 +1,209 @@
+"""历史记录检索模块
+
+为历史记录维护两类索引：
+- 记号倒排索引：记号（数字、运算符、函数名、错误信息）→ 记录序号列表
+- 结果有序索引：按结果数值排序，支持 "100..200" 这样的范围查询
+
+记录序号单调递增，倒排表只需追加；结果索引采用分层有序段（小段满后合并，
+段长有上限），单次追加的最坏代价有界、与记录总数无关，查询只在各段上二分查找。
+"""
+import heapq
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+_TOKEN_RE = re.compile(r"""
+    [0-9]+(?:\.[0-9]*)?(?:[eE][+-]?[0-9]+)?
+  | \.[0-9]+(?:[eE][+-]?[0-9]+)?
+  | [^\W\d_]+
+  | [^\s\w=()]
+""", re.VERBOSE)
+
+_INF = float('inf')
+
+_RANGE_RE = re.compile(r'^\s*(-?[0-9.eE+]*)\s*(?:\.\.|~)\s*(-?[0-9.eE+]*)\s*$')
+_COMPARE_RE = re.compile(r'^\s*(>=|<=|>|<)\s*(-?[0-9.eE+]+)\s*$')
+
+
+def _number_key(text):
+    """数字记号规范化，使 0.08250 与 0.0825 匹配"""
+    try:
+        return f"{float(text):.12g}"
+    except ValueError:
+        return text
+
+
+def tokenize(text):
+    """将记录或查询切分为规范化的记号"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text):
+        if token[0].isdigit() or token[0] == '.':
+            token = _number_key(token)
+        tokens.append(token)
+    return tokens
+
+
+def _parse_range(query):
+    """解析范围查询，返回 (low, high, strict)；不是范围查询时返回 None"""
+    match = _RANGE_RE.match(query)
+    if match and any(match.groups()):
+        low = float(match.group(1)) if match.group(1) else -_INF
+        high = float(match.group(2)) if match.group(2) else _INF
+        return low, high, False
+    match = _COMPARE_RE.match(query)
+    if match:
+        op, value = match.group(1), float(match.group(2))
+        if op[0] == '>':
+            return value, _INF, len(op) == 1
+        return -_INF, value, len(op) == 1
+    return None
+
+
+def record_result(record):
+    """取记录末尾的结果数值，不是数字时返回 None"""
+    parts = record.rsplit(None, 1)
+    if not parts:
+        return None
+    try:
+        return float(parts[-1])
+    except ValueError:
+        return None
+
+
+class _SortedRuns:
+    """分层有序段：追加先进入缓冲区，缓冲区满后排序成段，规模相当的相邻段合并
+
+    每段保存为两个紧凑数组（结果值、记录序号），按结果值有序。
+    段长达到 MAX_RUN 后不再合并，因此单次追加最多合并 MAX_RUN 个元素；
+    代价是段数随记录数线性增长（100 万条约 120 段），查询时多几次二分查找。
+    """
+    BUFFER_SIZE = 256
+    MAX_RUN = 8192
+
+    def __init__(self):
+        self.runs = []
+        self.buffer = []
+
+    def add(self, value, position):
+        self.buffer.append((value, position))
+        if len(self.buffer) >= self.BUFFER_SIZE:
+            values, positions = zip(*sorted(self.buffer))
+            values, positions = array('d', values), array('q', positions)
+            self.buffer = []
+            while (self.runs and len(self.runs[-1][0]) <= len(values)
+                   and len(self.runs[-1][0]) + len(values) <= self.MAX_RUN):
+                run_values, run_positions = self.runs.pop()
+                values, positions = self._merge(run_values + values, run_positions + positions)
+            self.runs.append((values, positions))
+
+    @staticmethod
+    def _merge(values, positions):
+        """按结果值重排两段首尾相接的有序数组
+
+        两段均已有序，timsort 只需线性合并；只排序下标，不创建元组，
+        避免大量临时对象触发垃圾回收。
+        """
+        order = sorted(range(len(values)), key=values.__getitem__)
+        return array('d', map(values.__getitem__, order)), array('q', map(positions.__getitem__, order))
+
+    def range(self, low, high, strict=False):
+        """返回结果在 [low, high]（strict 时为开区间）内的记录序号"""
+        positions = []
+        for values, run_positions in self.runs:
+            if strict:
+                start, stop = bisect_right(values, low), bisect_left(values, high)
+            else:
+                start, stop = bisect_left(values, low), bisect_right(values, high)
+            positions.extend(run_positions[start:stop])
+        if strict:
+            positions.extend(position for value, position in self.buffer if low < value < high)
+        else:
+            positions.extend(position for value, position in self.buffer if low <= value <= high)
+        return positions
+
+    def clear(self):
+        self.runs = []
+        self.buffer = []
+
+
+class HistoryIndex:
+    """历史记录检索索引"""
+    def __init__(self):
+        self.postings = {}
+        self.results = _SortedRuns()
+        self.count = 0
+
+    def add(self, position, record):
+        """索引一条记录（position 必须递增）"""
+        for token in set(tokenize(record)):
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = array('q')
+            posting.append(position)
+        value = record_result(record)
+        if value is not None and value == value:  # 跳过 NaN
+            self.results.add(value, position)
+        self.count = position + 1
+
+    def build(self, store, max_records=None, batch_size=10000):
+        """从存储中补齐尚未索引的记录，返回是否已全部索引
+
+        max_records 限制本次最多索引的条数，便于在界面线程中分片建立索引。
+        """
+        total = len(store)
+        if max_records is not None:
+            total = min(total, self.count + max_records)
+        for start in range(self.count, total, batch_size):
+            for offset, record in enumerate(store.records(start, min(start + batch_size, total))):
+                self.add(start + offset, record)
+        return self.count >= len(store)
+
+    def clear(self):
+        """清空索引"""
+        self.postings = {}
+        self.results.clear()
+        self.count = 0
+
+    def search(self, query, limit=None):
+        """查询，返回匹配记录的序号（最新的在前）
+
+        - "100..200" 或 "100~200"：结果在范围内（端点可省略）
+        - ">100"、"<=200"：结果比较
+        - 其他：记录包含查询中的全部记号
+
+        limit 限制返回的条数，记号查询找到足够的最新记录后即停止。
+        """
+        try:
+            bounds = _parse_range(query)
+        except ValueError:
+            bounds = None
+        if not bounds:
+            return self._match_tokens(tokenize(query), limit)
+        positions = self.results.range(*bounds)
+        if limit is not None:
+            return heapq.nlargest(limit, positions)
+        return sorted(positions, reverse=True)
+
+    def _match_tokens(self, tokens, limit=None):
+        """返回同时包含所有记号的记录序号（最新的在前，最多 limit 条）"""
+        if not tokens or limit == 0:
+            return []
+        postings = []
+        for token in set(tokens):
+            posting = self.postings.get(token)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        smallest, others = postings[0], postings[1:]
+        positions = []
+        for position in reversed(smallest):
+            for posting in others:
+                i = bisect_left(posting, position)
+                if i == len(posting) or posting[i] != position:
+                    break
+            else:
+                positions.append(position)
+                if len(positions) == limit:
+                    break
+        return positions
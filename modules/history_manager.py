@@ -1,32 +1,61 @@
 """历史记录管理器模块"""
-from PySide2.QtWidgets import QDialog, QVBoxLayout, QListWidget, QPushButton, QLabel
-from PySide2.QtCore import Qt
+from PySide2.QtWidgets import QDialog, QVBoxLayout, QListView, QPushButton, QLabel, QLineEdit
+from PySide2.QtCore import Qt, QTimer
+import atexit
+import time
+from .history_store import HistoryStore
+from .history_model import HistoryListModel, HistorySearchModel
+from .history_index import HistoryIndex
 
 class HistoryManager:
     """历史记录管理器类"""
-    def __init__(self):
-        self.history = []
+    # 分片建立检索索引：每次处理的记录数，以及每个时间片的最长耗时（秒）
+    INDEX_STEP = 500
+    INDEX_SLICE = 0.01
+    # 停止输入多久后执行检索（毫秒），以及最多显示的检索结果数
+    SEARCH_DELAY = 150
+    SEARCH_LIMIT = 1000
+    
+    def __init__(self, store_path="calculator_history"):
+        self.store = HistoryStore(store_path)  # 持久化的历史记录
+        atexit.register(self.store.close)
         self.dialog = None
+        self.model = None  # 对话框的列表模型，首次打开时创建
+        self.search_model = None
+        self.index = HistoryIndex()  # 检索索引，首次检索时分片建立
+        self.index_timer = None
+        self.search_timer = None
         self.on_expression_select = None  # 添加回调函数
     
     def add_record(self, expression, result):
         """添加一条历史记录"""
-        if expression and result:
-            record = f"{expression} {result}"
-            self.history.append(record)
-            # 最多保存100条记录
-            if len(self.history) > 100:
-                self.history.pop(0)
+        self.add_records([(expression, result)])
+    
+    def add_records(self, records):
+        """批量添加 (表达式, 结果) 记录，列表和检索结果只刷新一次"""
+        added = 0
+        for expression, result in records:
+            if expression and result:
+                record = f"{expression} {result}"
+                position = self.store.append(record)
+                # 索引已追上存储时增量更新，否则由分片建立过程补齐
+                if self.index.count == position:
+                    self.index.add(position, record)
+                added += 1
+        if added and self.model is not None:
+            self.model.record_added(added)
+            if self.search_input.text():
+                self.search(self.search_input.text())
     
     def set_expression_select_callback(self, callback):
         """设置表达式选择回调函数"""
         self.on_expression_select = callback
     
-    def handle_item_double_clicked(self, item):
+    def handle_item_double_clicked(self, index):
         """处理列表项双击事件"""
-        if self.on_expression_select and item:
+        if self.on_expression_select and index.isValid():
             # 从历史记录中提取表达式部分（去掉结果）
-            text = item.text()
+            text = index.data()
             if '=' in text:
                 expression = text.split('=')[0].strip()
                 if self.on_expression_select:
@@ -45,7 +74,7 @@ class HistoryManager:
                 QDialog {
                     background-color: rgba(255, 255, 255, 240);
                 }
-                QListWidget {
+                QListView {
                     background-color: rgba(255, 255, 255, 180);
                     border: 1px solid #ccc;
                     border-radius: 4px;
@@ -74,10 +103,30 @@ class HistoryManager:
             title.setAlignment(Qt.AlignCenter)
             layout.addWidget(title)
             
-            # 创建列表控件
-            self.list_widget = QListWidget()
-            self.list_widget.itemDoubleClicked.connect(self.handle_item_double_clicked)  # 添加双击事件处理
-            layout.addWidget(self.list_widget)
+            # 添加检索框
+            self.search_input = QLineEdit()
+            self.search_input.setPlaceholderText("搜索：0.0825、1000 ×、100..200、>50")
+            self.search_input.setClearButtonEnabled(True)
+            # 输入停顿后才检索，连续输入时只检索一次
+            self.search_timer = QTimer(self.dialog)
+            self.search_timer.setSingleShot(True)
+            self.search_timer.setInterval(self.SEARCH_DELAY)
+            self.search_timer.timeout.connect(lambda: self.search(self.search_input.text()))
+            self.search_input.textChanged.connect(lambda text: self.search_timer.start())
+            layout.addWidget(self.search_input)
+            
+            self.search_status = QLabel("")
+            self.search_status.hide()
+            layout.addWidget(self.search_status)
+            
+            # 创建列表视图（模型按需读取记录）
+            self.model = HistoryListModel(self.store, self.dialog)
+            self.search_model = HistorySearchModel(self.store, self.dialog)
+            self.list_view = QListView()
+            self.list_view.setUniformItemSizes(True)
+            self.list_view.setModel(self.model)
+            self.list_view.doubleClicked.connect(self.handle_item_double_clicked)  # 添加双击事件处理
+            layout.addWidget(self.list_view)
             
             # 添加清除按钮
             clear_button = QPushButton("清除历史记录")
@@ -89,15 +138,60 @@ class HistoryManager:
             close_button.clicked.connect(self.dialog.close)
             layout.addWidget(close_button)
         
-        # 更新列表内容
-        self.list_widget.clear()
-        for record in reversed(self.history):  # 最新的记录显示在顶部
-            self.list_widget.addItem(record)
-        
+        self.list_view.scrollToTop()  # 最新的记录显示在顶部
         self.dialog.show()
     
     def clear_history(self):
         """清除历史记录"""
-        self.history.clear()
-        if self.dialog:
-            self.list_widget.clear()
+        self.store.clear()
+        self.index.clear()
+        if self.model is not None:
+            self.model.reload()
+            self.search_model.set_positions([])
+    
+    def search(self, query):
+        """按检索框内容过滤历史记录"""
+        query = query.strip()
+        if not query:
+            self.search_status.hide()
+            self.list_view.setModel(self.model)
+            return
+        
+        if self.index.count < len(self.store):
+            self.start_indexing()
+        self.search_model.set_positions(self.index.search(query, self.SEARCH_LIMIT))
+        self.list_view.setModel(self.search_model)
+        self.update_search_status()
+    
+    def start_indexing(self):
+        """在界面线程中分片建立检索索引，避免长时间阻塞"""
+        if self.index_timer is None:
+            self.index_timer = QTimer(self.dialog)
+            self.index_timer.setInterval(0)
+            self.index_timer.timeout.connect(self.index_step)
+        if not self.index_timer.isActive():
+            self.index_timer.start()
+    
+    def index_step(self):
+        """在一个时间片内建立索引，完成后刷新检索结果"""
+        deadline = time.perf_counter() + self.INDEX_SLICE
+        done = self.index.build(self.store, self.INDEX_STEP)
+        while not done and time.perf_counter() < deadline:
+            done = self.index.build(self.store, self.INDEX_STEP)
+        if done:
+            self.index_timer.stop()
+            self.search(self.search_input.text())
+        else:
+            self.update_search_status()
+    
+    def update_search_status(self):
+        """显示索引建立进度，结果超出上限时提示只显示最新的部分"""
+        total = len(self.store)
+        if self.index.count < total:
+            self.search_status.setText(f"正在建立索引 {self.index.count * 100 // total}%")
+            self.search_status.show()
+        elif self.search_model.rowCount() >= self.SEARCH_LIMIT:
+            self.search_status.setText(f"只显示最新的 {self.SEARCH_LIMIT} 条结果")
+            self.search_status.show()
+        else:
+            self.search_status.hide()
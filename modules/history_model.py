@@ -0,0 +1,99 @@
+"""历史记录列表模型模块"""
+from PySide2.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class HistoryListModel(QAbstractListModel):
+    """按需从 HistoryStore 读取的历史记录模型，最新的记录在顶部
+
+    视图滚动到底部时通过 canFetchMore/fetchMore 分批增加行数，
+    data() 只读取可见行所在的一页记录。
+    """
+    # 每次 fetchMore 增加的行数
+    FETCH_SIZE = 200
+    # 每页缓存的记录条数
+    PAGE_SIZE = 256
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._loaded = 0
+        self._page_start = 0
+        self._page = []
+
+    def rowCount(self, parent=QModelIndex()):
+        """已加载的行数"""
+        if parent.isValid():
+            return 0
+        return self._loaded
+
+    def canFetchMore(self, parent):
+        """是否还有未加载的记录"""
+        if parent.isValid():
+            return False
+        return self._loaded < len(self.store)
+
+    def fetchMore(self, parent):
+        """再加载一批行"""
+        if parent.isValid():
+            return
+        count = min(self.FETCH_SIZE, len(self.store) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        """返回行对应的记录文本"""
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self.record(len(self.store) - 1 - index.row())
+
+    def record(self, position):
+        """按存储序号读取记录（整页缓存）"""
+        offset = position - self._page_start
+        if not 0 <= offset < len(self._page):
+            self._page_start = position - position % self.PAGE_SIZE
+            self._page = self.store.records(self._page_start, self._page_start + self.PAGE_SIZE)
+            offset = position - self._page_start
+        return self._page[offset]
+
+    def record_added(self, count=1):
+        """存储中追加了 count 条记录，在顶部插入相应的行"""
+        self.beginInsertRows(QModelIndex(), 0, count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def reload(self):
+        """存储被清空或替换后重置模型"""
+        self.beginResetModel()
+        self._loaded = 0
+        self._page_start = 0
+        self._page = []
+        self.endResetModel()
+
+
+class HistorySearchModel(QAbstractListModel):
+    """检索结果模型，只保存匹配记录的序号"""
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.positions = []
+
+    def set_positions(self, positions):
+        """替换检索结果（序号按最新在前排列）"""
+        self.beginResetModel()
+        self.positions = positions
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        """结果条数"""
+        if parent.isValid():
+            return 0
+        return len(self.positions)
+
+    def data(self, index, role=Qt.DisplayRole):
+        """返回行对应的记录文本"""
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self.store[self.positions[index.row()]]
@@ -0,0 +1,167 @@
+"""历史记录存储模块
+
+历史记录保存在只追加的日志文件中，另有一个偏移索引文件：
+- 数据文件（.log）：UTF-8 文本，每条记录一行
+- 索引文件（.idx）：每条记录一个 8 字节小端无符号整数，表示该记录在数据文件中的结束偏移
+
+追加一条记录只需两次缓冲写入；按序号读取时通过 mmap 定位，不必读入整个文件。
+索引丢失或落后于数据文件时，按换行符从数据文件补齐，只截掉末尾不完整的一行。
+"""
+import mmap
+import os
+import struct
+
+_OFFSET = struct.Struct('<Q')
+
+
+class HistoryStore:
+    """只追加的历史记录存储"""
+    # 补齐索引时每次读取数据文件的字节数
+    SCAN_CHUNK = 1024 * 1024
+
+    def __init__(self, path="calculator_history"):
+        self.data_path = path + ".log"
+        self.index_path = path + ".idx"
+        self._data_map = None
+        self._index_map = None
+        self._dirty = False
+        self._open()
+
+    def _open(self):
+        """打开文件并校验索引（只检查末尾，索引完整时启动耗时与记录数无关）"""
+        self._data_file = open(self.data_path, 'ab')
+        self._index_file = open(self.index_path, 'ab')
+        data_size = self._data_file.tell()
+        index_size = self._index_file.tell()
+        count = index_size // _OFFSET.size
+
+        # 上次异常退出可能留下不完整的索引项或指向未写入数据的索引
+        if count:
+            with open(self.index_path, 'rb') as f:
+                while count:
+                    f.seek((count - 1) * _OFFSET.size)
+                    if _OFFSET.unpack(f.read(_OFFSET.size))[0] <= data_size:
+                        break
+                    count -= 1
+        if count * _OFFSET.size != index_size:
+            self._index_file.truncate(count * _OFFSET.size)
+            self._index_file.seek(0, os.SEEK_END)
+        self._count = count
+        self._data_end = self._end_offset(count) if count else 0
+        if self._data_end < data_size:
+            self._rebuild_index()
+        if self._data_end != data_size:
+            self._data_file.truncate(self._data_end)
+            self._data_file.seek(0, os.SEEK_END)
+
+    def _rebuild_index(self):
+        """从最后一条已索引记录之后扫描数据文件，为每个完整的行补上索引项"""
+        with open(self.data_path, 'rb') as f:
+            f.seek(self._data_end)
+            position = self._data_end
+            while True:
+                chunk = f.read(self.SCAN_CHUNK)
+                if not chunk:
+                    break
+                start = 0
+                while True:
+                    end = chunk.find(b'\n', start) + 1
+                    if not end:
+                        break
+                    self._index_file.write(_OFFSET.pack(position + end))
+                    self._count += 1
+                    self._data_end = position + end
+                    start = end
+                position += len(chunk)
+        self._index_file.flush()
+
+    def _end_offset(self, count):
+        """读取第 count 条记录的结束偏移"""
+        with open(self.index_path, 'rb') as f:
+            f.seek((count - 1) * _OFFSET.size)
+            return _OFFSET.unpack(f.read(_OFFSET.size))[0]
+
+    def __len__(self):
+        return self._count
+
+    def append(self, record):
+        """追加一条记录"""
+        data = record.replace('\n', ' ').encode('utf-8') + b'\n'
+        self._data_end += len(data)
+        self._data_file.write(data)
+        self._index_file.write(_OFFSET.pack(self._data_end))
+        self._count += 1
+        self._dirty = True
+        return self._count - 1
+
+    def flush(self):
+        """将缓冲区写入磁盘（先写数据再写索引）"""
+        if self._dirty:
+            self._data_file.flush()
+            self._index_file.flush()
+            self._dirty = False
+
+    def _maps(self):
+        """返回覆盖当前全部记录的 (索引, 数据) mmap"""
+        self.flush()
+        index_size = self._count * _OFFSET.size
+        if self._index_map is None or len(self._index_map) < index_size:
+            self._close_maps()
+            with open(self.index_path, 'rb') as f:
+                self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(self.data_path, 'rb') as f:
+                self._data_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._index_map, self._data_map
+
+    def _close_maps(self):
+        if self._index_map is not None:
+            self._index_map.close()
+            self._data_map.close()
+            self._index_map = None
+            self._data_map = None
+
+    def records(self, start, stop):
+        """读取 [start, stop) 范围内的记录（按时间顺序）"""
+        start = max(start, 0)
+        stop = min(stop, self._count)
+        if start >= stop:
+            return []
+        index_map, data_map = self._maps()
+        offsets = struct.unpack_from(f'<{stop - start}Q', index_map, start * _OFFSET.size)
+        begin = _OFFSET.unpack_from(index_map, (start - 1) * _OFFSET.size)[0] if start else 0
+        records = []
+        for end in offsets:
+            records.append(data_map[begin:end - 1].decode('utf-8', errors='replace'))
+            begin = end
+        return records
+
+    def __getitem__(self, position):
+        """按序号读取一条记录，支持负数序号"""
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError("历史记录序号超出范围")
+        return self.records(position, position + 1)[0]
+
+    def latest(self, n):
+        """读取最新的 n 条记录（按时间顺序）"""
+        return self.records(self._count - n, self._count)
+
+    def clear(self):
+        """清除全部记录"""
+        self._close_maps()
+        self._data_file.truncate(0)
+        self._index_file.truncate(0)
+        self._data_file.seek(0)
+        self._index_file.seek(0)
+        self._count = 0
+        self._data_end = 0
+        self._dirty = False
+
+    def close(self):
+        """关闭存储"""
+        self._close_maps()
+        if not self._data_file.closed:
+            self.flush()
+            self._data_file.close()
+            self._index_file.close()
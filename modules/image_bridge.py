@@ -0,0 +1,77 @@
+"""图像转换模块
+
+把 PIL 图像或 NumPy 数组转换为 QImage / QPixmap，尽量减少整图复制：
+- NumPy 数组：QImage 直接引用数组内存，不复制
+- PIL 图像：按 Qt 的原生像素格式导出一次（RGBA 导出为预乘的 BGRA，
+  RGB 保持三通道），QPixmap.fromImage 时不再需要格式转换
+
+QImage 不会持有外部缓冲区的引用，这里把缓冲区的所有者挂在
+QImage 的 buffer_owner 属性上，保证其生命周期不短于 QImage。
+"""
+import sys
+
+from PySide2.QtGui import QImage, QPixmap
+
+# PIL 模式 -> (导出的原始格式, 每像素字节数, QImage 格式)
+_PIL_FORMATS = {
+    'RGB': ('RGB', 3, QImage.Format_RGB888),
+    'L': ('L', 1, QImage.Format_Grayscale8),
+}
+if sys.byteorder == 'little':
+    # 小端机器上 Qt 32 位格式的内存字节序为 B,G,R,A，预乘格式可直接用于 QPixmap
+    _PIL_FORMATS['RGBA'] = ('BGRa', 4, QImage.Format_ARGB32_Premultiplied)
+else:
+    _PIL_FORMATS['RGBA'] = ('RGBA', 4, QImage.Format_RGBA8888)
+
+# NumPy 数组通道数 -> QImage 格式
+_ARRAY_FORMATS = {
+    4: QImage.Format_RGBA8888,
+    3: QImage.Format_RGB888,
+    1: QImage.Format_Grayscale8,
+}
+
+
+def _wrap(buffer, owner, width, height, bytes_per_line, image_format):
+    """用外部缓冲区创建 QImage 并保持所有者存活"""
+    qimage = QImage(buffer, width, height, bytes_per_line, image_format)
+    qimage.buffer_owner = owner
+    return qimage
+
+
+def array_to_qimage(array):
+    """NumPy uint8 数组（H×W、H×W×3 或 H×W×4）→ 共享内存的 QImage"""
+    if array.dtype.name != 'uint8':
+        raise ValueError("只支持 uint8 数组")
+    channels = 1 if array.ndim == 2 else array.shape[2]
+    if channels not in _ARRAY_FORMATS:
+        raise ValueError(f"不支持 {channels} 通道的数组")
+    height, width = array.shape[:2]
+    # 每行内部必须连续，行与行之间可以有填充
+    if array.strides[-1] != 1 or (array.ndim == 3 and array.strides[1] != channels):
+        raise ValueError("数组的行内数据必须连续")
+    return _wrap(array.data, array, width, height, array.strides[0], _ARRAY_FORMATS[channels])
+
+
+def pil_to_qimage(image):
+    """PIL 图像 → QImage，像素数据只复制一次
+
+    RGBA、RGB、L 直接导出，其他模式先转换为 RGBA。
+    """
+    if image.mode not in _PIL_FORMATS:
+        image = image.convert('RGBA')
+    rawmode, pixel_size, image_format = _PIL_FORMATS[image.mode]
+    data = image.tobytes('raw', rawmode)
+    return _wrap(data, data, image.width, image.height, image.width * pixel_size, image_format)
+
+
+def to_qimage(source):
+    """PIL 图像或 NumPy 数组 → QImage"""
+    if hasattr(source, 'tobytes') and hasattr(source, 'mode'):
+        return pil_to_qimage(source)
+    return array_to_qimage(source)
+
+
+def to_qpixmap(source):
+    """PIL 图像、NumPy 数组或 QImage → QPixmap"""
+    qimage = source if isinstance(source, QImage) else to_qimage(source)
+    return QPixmap.fromImage(qimage)
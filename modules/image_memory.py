@@ -0,0 +1,195 @@
+"""图像内存统计模块
+
+背景相关的各个缓存（缩放后的 QPixmap、动画帧、图像金字塔）都登记到同一个
+ImageMemory 上，由它统计常驻字节数，并在超出总预算时跨缓存淘汰。
+
+淘汰时在各缓存给出的候选项中，选择“闲置时间 × 字节数 ÷ 重建代价”最大的一项：
+越久没用、越大、越容易重建的越先淘汰。金字塔这类不可淘汰的图像只计入统计。
+缓存只在界面线程中访问，不需要加锁。
+"""
+from collections import OrderedDict
+
+
+def image_bytes(image):
+    """估算 PIL 图像、QImage 或 QPixmap 占用的字节数"""
+    if hasattr(image, 'mode'):
+        # PIL 内部把三通道和四通道像素都存为 32 位
+        bands = len(image.getbands())
+        return image.width * image.height * (4 if bands >= 3 else bands)
+    if hasattr(image, 'sizeInBytes'):
+        return image.sizeInBytes()
+    return image.width() * image.height() * max(image.depth(), 8) // 8
+
+
+class ImageMemory:
+    """图像内存预算与统计"""
+    # 默认的总预算（字节）
+    DEFAULT_BUDGET = 256 * 2**20
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.caches = []
+        self.clock = 0  # 全局访问计数，用于跨缓存比较闲置时间
+
+    def tick(self):
+        """返回新的访问时间"""
+        self.clock += 1
+        return self.clock
+
+    def register(self, cache):
+        """登记缓存"""
+        if cache not in self.caches:
+            self.caches.append(cache)
+        return cache
+
+    def unregister(self, cache):
+        """注销缓存"""
+        if cache in self.caches:
+            self.caches.remove(cache)
+
+    @property
+    def resident_bytes(self):
+        return sum(cache.resident_bytes for cache in self.caches)
+
+    def set_budget(self, budget):
+        """修改总预算并立即按新预算淘汰"""
+        self.budget = budget
+        self.enforce()
+
+    def enforce(self):
+        """超出预算时按代价淘汰，直到回到预算内或没有可淘汰的项"""
+        excess = self.resident_bytes - self.budget
+        while excess > 0:
+            best = None
+            for cache in self.caches:
+                key = cache.victim()
+                if key is None:
+                    continue
+                nbytes, last_used = cache.entry_info(key)
+                score = (self.clock - last_used + 1) * nbytes / cache.cost
+                if best is None or score > best[0]:
+                    best = (score, cache, key)
+            if best is None:
+                break
+            excess -= best[1].evict(best[2])
+
+    def report(self):
+        """返回各缓存的常驻字节数，以及总量和预算"""
+        report = {}
+        for cache in self.caches:
+            report[cache.name] = report.get(cache.name, 0) + cache.resident_bytes
+        report['total'] = sum(report.values())
+        report['budget'] = self.budget
+        return report
+
+
+class ImageCache:
+    """登记到 ImageMemory 的最近最少使用缓存
+
+    max_bytes、max_entries 是该缓存自己的上限；cost 是重建一个字节的相对代价。
+    """
+    def __init__(self, name, memory=None, max_bytes=None, max_entries=None, cost=1.0):
+        self.name = name
+        self.memory = memory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.cost = cost
+        self.entries = OrderedDict()  # 键 -> [值, 字节数, 最近使用时间]
+        self.resident_bytes = 0
+        self.clock = 0
+        if memory is not None:
+            memory.register(self)
+
+    def tick(self):
+        if self.memory is not None:
+            return self.memory.tick()
+        self.clock += 1
+        return self.clock
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """读取并标记为最近使用"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        entry[2] = self.tick()
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        """加入一项，超出上限时淘汰"""
+        self.pop(key)
+        nbytes = image_bytes(value)
+        self.entries[key] = [value, nbytes, self.tick()]
+        self.resident_bytes += nbytes
+        self.trim()
+        if self.memory is not None:
+            self.memory.enforce()
+
+    def pop(self, key):
+        """移除一项并返回其值"""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        self.resident_bytes -= entry[1]
+        return entry[0]
+
+    def over_limit(self):
+        """是否超出该缓存自己的上限"""
+        return ((self.max_bytes is not None and self.resident_bytes > self.max_bytes) or
+                (self.max_entries is not None and len(self.entries) > self.max_entries))
+
+    def trim(self):
+        """淘汰到自身上限以内（至少保留一项）"""
+        while len(self.entries) > 1 and self.over_limit():
+            self.evict(self.victim())
+
+    def victim(self):
+        """下一个应淘汰的键"""
+        return next(iter(self.entries), None)
+
+    def entry_info(self, key):
+        """返回 (字节数, 最近使用时间)"""
+        _, nbytes, last_used = self.entries[key]
+        return nbytes, last_used
+
+    def evict(self, key):
+        """淘汰一项，返回释放的字节数"""
+        nbytes = self.entries[key][1]
+        self.pop(key)
+        return nbytes
+
+    def clear(self):
+        self.entries.clear()
+        self.resident_bytes = 0
+
+    def close(self):
+        """清空并注销"""
+        self.clear()
+        if self.memory is not None:
+            self.memory.unregister(self)
+
+
+class ImageSet:
+    """只计入统计、不可淘汰的一组图像（如图像金字塔）"""
+    cost = float('inf')
+
+    def __init__(self, name, memory=None):
+        self.name = name
+        self.images = []
+        self.resident_bytes = 0
+        if memory is not None:
+            memory.register(self)
+
+    def set(self, images):
+        """替换这组图像"""
+        self.images = list(images or [])
+        self.resident_bytes = sum(image_bytes(image) for image in self.images)
+
+    def victim(self):
+        return None
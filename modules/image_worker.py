@@ -0,0 +1,88 @@
+"""后台图像任务模块
+
+在 QThreadPool 上解码和缩放图像，结果通过信号回到界面线程。
+同一通道（如 "resize"）只保留最新的请求：旧请求在开始执行前或执行过程中
+被取消，已完成的过期结果也不会再投递。
+"""
+from itertools import count
+
+from PySide2.QtCore import QObject, QRunnable, QThreadPool, Qt, Signal, Slot
+
+
+class _TaskSignals(QObject):
+    """任务完成信号（通道，请求号，结果，错误信息）"""
+    done = Signal(str, int, object, str)
+
+
+class _ImageTask(QRunnable):
+    """在线程池中执行的单个图像任务"""
+    def __init__(self, channel, request_id, job, is_current):
+        super().__init__()
+        self.channel = channel
+        self.request_id = request_id
+        self.job = job
+        self.is_current = is_current
+        self.signals = _TaskSignals()
+
+    def cancelled(self):
+        """该请求是否已被更新的请求取代"""
+        return not self.is_current(self.channel, self.request_id)
+
+    def run(self):
+        result = None
+        error = ""
+        if not self.cancelled():
+            try:
+                result = self.job(self.cancelled)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+        self.signals.done.emit(self.channel, self.request_id, result, error)
+
+
+class ImageWorker(QObject):
+    """图像任务调度器"""
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._ids = count(1)
+        self._latest = {}  # 通道 -> 最新请求号
+        self._pending = {}  # 请求号 -> (任务, 回调, 错误回调)
+
+    def submit(self, channel, job, callback, error_callback=None):
+        """提交任务，取代该通道上尚未投递的旧请求
+
+        job(cancelled) 在工作线程中执行，应在耗时步骤之间检查 cancelled()，
+        返回值在界面线程中传给 callback。
+        """
+        request_id = next(self._ids)
+        self._latest[channel] = request_id
+        task = _ImageTask(channel, request_id, job, self.is_current)
+        task.signals.done.connect(self._on_done, Qt.QueuedConnection)
+        self._pending[request_id] = (task, callback, error_callback)
+        self.pool.start(task)
+        return request_id
+
+    def cancel(self, channel):
+        """取消通道上的请求"""
+        self._latest.pop(channel, None)
+
+    def is_current(self, channel, request_id):
+        """请求是否仍是该通道上最新的请求"""
+        return self._latest.get(channel) == request_id
+
+    def is_busy(self, channel):
+        """通道上是否有尚未投递的请求"""
+        return channel in self._latest
+
+    @Slot(str, int, object, str)
+    def _on_done(self, channel, request_id, result, error):
+        """在界面线程中投递结果，过期的结果直接丢弃"""
+        task, callback, error_callback = self._pending.pop(request_id, (None, None, None))
+        if not self.is_current(channel, request_id):
+            return
+        del self._latest[channel]
+        if error:
+            if error_callback:
+                error_callback(error)
+        elif callback:
+            callback(result)
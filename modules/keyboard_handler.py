@@ -3,9 +3,11 @@ from PySide2.QtCore import Qt
 
 class KeyboardHandler:
     """键盘事件处理器"""
-    def __init__(self, button_callback, expression_display):
+    def __init__(self, button_callback, expression_display, undo_callback=None, redo_callback=None):
         self.button_callback = button_callback
         self.expression_display = expression_display
+        self.undo_callback = undo_callback
+        self.redo_callback = redo_callback
     
     def handle_key_press(self, event):
         """处理键盘事件"""
@@ -20,6 +22,18 @@ class KeyboardHandler:
         elif key == Qt.Key_V and event.modifiers() == Qt.ControlModifier:
             return False  # 让主窗口处理粘贴操作
         
+        # 处理Ctrl+Z（撤销）
+        elif key == Qt.Key_Z and event.modifiers() == Qt.ControlModifier and self.undo_callback:
+            self.undo_callback()
+            return True
+        
+        # 处理Ctrl+Y和Ctrl+Shift+Z（重做）
+        elif self.redo_callback and (
+                (key == Qt.Key_Y and event.modifiers() == Qt.ControlModifier)
+                or (key == Qt.Key_Z and event.modifiers() == Qt.ControlModifier | Qt.ShiftModifier)):
+            self.redo_callback()
+            return True
+        
         # 数字键（包括主键盘和小键盘）
         elif text.isdigit():
             self.button_callback(text)
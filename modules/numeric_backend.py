@@ -0,0 +1,179 @@
+"""数值后端模块
+
+CalculatorCore 的数值运算可以切换不同的后端：
+- float：二进制浮点，速度最快（默认）
+- decimal：十进制定点，精度可配置，连续加乘不累积二进制舍入误差
+- fraction：有理数精确运算
+
+每个后端提供解析、四则运算、开方、倒数和格式化方法。
+"""
+import decimal
+import math
+import operator
+from fractions import Fraction
+
+
+class FloatBackend:
+    """二进制浮点后端"""
+    name = 'float'
+
+    parse = staticmethod(float)
+    negate = staticmethod(operator.neg)
+    add = staticmethod(operator.add)
+    subtract = staticmethod(operator.sub)
+    multiply = staticmethod(operator.mul)
+    divide = staticmethod(operator.truediv)
+
+    def sqrt(self, value):
+        """开方"""
+        return math.sqrt(value)
+
+    def reciprocal(self, value):
+        """倒数"""
+        return 1 / value
+
+    def format(self, num):
+        """整数不显示小数点，小数保留12位有效数字"""
+        float_num = float(num)
+        if float_num.is_integer():
+            return str(int(float_num))
+        return f"{float_num:.12g}"
+
+    def __eq__(self, other):
+        return isinstance(other, FloatBackend)
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __repr__(self):
+        return "FloatBackend()"
+
+
+class DecimalBackend:
+    """十进制后端，精度（有效数字位数）可配置"""
+    name = 'decimal'
+
+    def __init__(self, precision=28):
+        self.precision = precision
+        # 放宽指数范围，避免 x² 很快溢出
+        self.context = decimal.Context(prec=precision, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+        self.negate = self.context.minus
+        self.add = self.context.add
+        self.subtract = self.context.subtract
+        self.multiply = self.context.multiply
+        self.divide = self.context.divide
+
+    def parse(self, text):
+        """解析数字，按当前精度舍入"""
+        return self.context.create_decimal(text)
+
+    def sqrt(self, value):
+        """开方"""
+        return self.context.sqrt(value)
+
+    def reciprocal(self, value):
+        """倒数"""
+        return self.context.divide(1, value)
+
+    def format(self, num):
+        """整数不显示小数点，小数去除尾部多余的0"""
+        if not isinstance(num, decimal.Decimal):
+            num = self.parse(num)
+        if num.adjusted() < self.precision and num == num.to_integral_value():
+            return format(num.to_integral_value(), 'f')
+        # 超出精度的大数和小数使用 Decimal 的规范表示（必要时为科学计数法）
+        return str(num.normalize(self.context))
+
+    def __eq__(self, other):
+        return isinstance(other, DecimalBackend) and other.precision == self.precision
+
+    def __hash__(self):
+        return hash((self.name, self.precision))
+
+    def __repr__(self):
+        return f"DecimalBackend(precision={self.precision})"
+
+
+class FractionBackend:
+    """有理数精确后端
+
+    有限小数显示为十进制小数，无限循环小数显示为 "分子/分母"，
+    因此显示结果可以无损地再次解析。
+    """
+    name = 'fraction'
+
+    parse = Fraction
+    negate = staticmethod(operator.neg)
+    add = staticmethod(operator.add)
+    subtract = staticmethod(operator.sub)
+    multiply = staticmethod(operator.mul)
+    divide = staticmethod(operator.truediv)
+
+    def __init__(self, sqrt_precision=28):
+        # 无理数开方时使用的十进制近似精度
+        self.sqrt_precision = sqrt_precision
+        self.sqrt_context = decimal.Context(prec=sqrt_precision)
+
+    def sqrt(self, value):
+        """开方，完全平方数返回精确结果"""
+        numerator = math.isqrt(value.numerator)
+        denominator = math.isqrt(value.denominator)
+        if numerator * numerator == value.numerator and denominator * denominator == value.denominator:
+            return Fraction(numerator, denominator)
+        approx = self.sqrt_context.divide(decimal.Decimal(value.numerator), decimal.Decimal(value.denominator))
+        return Fraction(self.sqrt_context.sqrt(approx))
+
+    def reciprocal(self, value):
+        """倒数"""
+        return 1 / value
+
+    def format(self, num):
+        """整数、有限小数或 "分子/分母" """
+        if not isinstance(num, Fraction):
+            num = Fraction(num)
+        numerator, denominator = num.numerator, num.denominator
+        if denominator == 1:
+            return str(numerator)
+        # 分母只含因子2和5时是有限小数
+        twos = (denominator & -denominator).bit_length() - 1
+        rest = denominator >> twos
+        fives = 0
+        while rest % 5 == 0:
+            rest //= 5
+            fives += 1
+        if rest != 1:
+            return f"{numerator}/{denominator}"
+        places = max(twos, fives)
+        digits = str(abs(numerator) * 10 ** places // denominator).rjust(places + 1, '0')
+        sign = '-' if numerator < 0 else ''
+        return f"{sign}{digits[:-places]}.{digits[-places:]}"
+
+    def __eq__(self, other):
+        return isinstance(other, FractionBackend) and other.sqrt_precision == self.sqrt_precision
+
+    def __hash__(self):
+        return hash((self.name, self.sqrt_precision))
+
+    def __repr__(self):
+        return f"FractionBackend(sqrt_precision={self.sqrt_precision})"
+
+
+# 默认后端
+FLOAT_BACKEND = FloatBackend()
+
+BACKENDS = {
+    'float': FloatBackend,
+    'decimal': DecimalBackend,
+    'fraction': FractionBackend,
+}
+
+
+def create_backend(name='float', **options):
+    """按名称创建数值后端"""
+    if name == 'float' and not options:
+        return FLOAT_BACKEND
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"未知的数值后端: {name}") from None
+    return backend_class(**options)
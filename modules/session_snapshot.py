@@ -0,0 +1,203 @@
+"""会话快照模块
+
+退出时把会话状态写成一个紧凑的二进制快照，下次启动时在显示窗口前恢复：
+- 计算器核心状态（CalculatorCore.snapshot 的结果）
+- 窗口大小和显示区内容
+- 按最后窗口大小缩放好的背景像素（zlib 压缩），恢复后直接绘制，并交给背景管理器
+  作为该尺寸档位的缓存，窗口大小不变时不再解码原图或缩放
+
+文件格式：文件头（魔数、版本号、段数）后接若干段，每段为 4 字节标签、
+长度和内容。读取时先只读文件头，版本不符的旧快照立即丢弃；
+其余内容一次顺序读入，各段用 memoryview 切片，不再复制。
+背景段记录了原图的路径、修改时间和大小，与当前设置不符时忽略；动画背景不保存像素。
+历史记录本身已持久化在 HistoryStore 中，不进入快照。
+"""
+import logging
+import os
+import struct
+import tempfile
+import zlib
+
+from PySide2.QtGui import QImage, QPixmap
+
+logger = logging.getLogger(__name__)
+
+
+class _Writer:
+    """按顺序拼接二进制字段"""
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt, *values):
+        self.parts.append(struct.pack(fmt, *values))
+
+    def string(self, text):
+        """长度前缀的 UTF-8 字符串，None 记为长度 0xFFFFFFFF"""
+        if text is None:
+            self.pack('<I', 0xFFFFFFFF)
+        else:
+            data = str(text).encode('utf-8')
+            self.pack('<I', len(data))
+            self.parts.append(data)
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+
+class _Reader:
+    """按顺序读取 _Writer 写入的字段"""
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def bytes(self, length):
+        view = self.data[self.offset:self.offset + length]
+        if len(view) != length:
+            raise ValueError("快照数据不完整")
+        self.offset += length
+        return view
+
+    def string(self):
+        length, = self.unpack('<I')
+        if length == 0xFFFFFFFF:
+            return None
+        return bytes(self.bytes(length)).decode('utf-8')
+
+
+class SessionSnapshot:
+    """会话快照文件"""
+    MAGIC = b'CALCSNAP'
+    VERSION = 3
+    # 魔数、版本号、段数
+    HEADER = struct.Struct('<8sHH')
+    # 段标签、段长度
+    SECTION = struct.Struct('<4sI')
+    # 背景段：原图修改时间、原图大小、宽、高、每行字节数
+    BACKGROUND = struct.Struct('<qqIII')
+    # 保存背景像素时统一使用的格式，QPixmap 可以直接使用
+    IMAGE_FORMAT = QImage.Format_ARGB32_Premultiplied
+    # 背景像素的压缩级别（退出时压缩，取速度最快的级别）
+    COMPRESS_LEVEL = 1
+
+    def __init__(self, path="session.snapshot"):
+        self.path = path
+
+    @staticmethod
+    def file_signature(path):
+        """原图的 (修改时间, 大小)，文件不存在时返回 None"""
+        try:
+            stat = os.stat(path)
+        except (OSError, TypeError):
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def save(self, core, ui, background_path=None):
+        """保存核心状态、窗口状态和当前绘制的背景"""
+        sections = [(b'CORE', core.snapshot())]
+
+        view = _Writer()
+        view.pack('<II', ui.width(), ui.height())
+        view.string(ui.expression_display.text())
+        view.string(ui.result_label.text())
+        sections.append((b'VIEW', view.getvalue()))
+
+        signature = self.file_signature(background_path)
+        pixmap = ui.background_widget.current_pixmap()
+        if signature and pixmap is not None and ui.background_widget.animation is None:
+            image = ui.background_widget.get_scaled_pixmap().toImage().convertToFormat(self.IMAGE_FORMAT)
+            background = _Writer()
+            background.string(background_path)
+            background.pack(self.BACKGROUND.format, *signature,
+                            image.width(), image.height(), image.bytesPerLine())
+            background.parts.append(zlib.compress(image.constBits()[:image.sizeInBytes()],
+                                                  self.COMPRESS_LEVEL))
+            sections.append((b'BGPX', background.getvalue()))
+
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(self.HEADER.pack(self.MAGIC, self.VERSION, len(sections)))
+                    for tag, payload in sections:
+                        f.write(self.SECTION.pack(tag, len(payload)))
+                        f.write(payload)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logger.error(f"保存会话快照时出错: {str(e)}")
+
+    def load(self):
+        """读取快照，返回 {标签: memoryview}；不存在、版本不符或损坏时返回 None"""
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.read(self.HEADER.size)
+                if len(header) != self.HEADER.size:
+                    return None
+                magic, version, count = self.HEADER.unpack(header)
+                if magic != self.MAGIC or version != self.VERSION:
+                    return None
+                data = memoryview(f.read())
+        except OSError:
+            return None
+        sections = {}
+        offset = 0
+        try:
+            for _ in range(count):
+                tag, length = self.SECTION.unpack_from(data, offset)
+                offset += self.SECTION.size
+                if offset + length > len(data):
+                    return None
+                sections[tag] = data[offset:offset + length]
+                offset += length
+        except struct.error:
+            return None
+        return sections
+
+    def restore(self, core, ui, background_path=None):
+        """在窗口显示前恢复快照，成功时返回 True"""
+        sections = self.load()
+        if not sections:
+            return False
+        try:
+            if b'CORE' in sections:
+                core.restore(sections[b'CORE'])
+                ui.update_memory_indicator(core.has_memory)
+            if b'VIEW' in sections:
+                reader = _Reader(sections[b'VIEW'])
+                width, height = reader.unpack('<II')
+                ui.resize(width, height)
+                ui.expression_display.setText(reader.string() or "")
+                ui.result_label.setText(reader.string() or "")
+            if b'BGPX' in sections:
+                self.restore_background(sections[b'BGPX'], ui, background_path)
+        except (ValueError, struct.error) as e:
+            logger.error(f"恢复会话快照时出错: {str(e)}")
+            return False
+        return True
+
+    def restore_background(self, data, ui, background_path):
+        """背景原图没有变化时直接显示快照中的像素，并记下它对应的窗口大小"""
+        reader = _Reader(data)
+        path = reader.string()
+        mtime, size, width, height, bytes_per_line = reader.unpack(self.BACKGROUND.format)
+        if path != background_path or self.file_signature(path) != (mtime, size):
+            return False
+        try:
+            pixels = zlib.decompress(reader.bytes(len(data) - reader.offset))
+        except zlib.error as e:
+            raise ValueError(f"背景像素无法解压: {e}")
+        if len(pixels) != bytes_per_line * height:
+            raise ValueError("快照数据不完整")
+        image = QImage(pixels, width, height, bytes_per_line, self.IMAGE_FORMAT)
+        # fromImage 会复制像素，之后不再引用快照数据
+        ui.background_widget.setBackgroundPixmap(QPixmap.fromImage(image))
+        ui.restored_background = (path, (ui.width(), ui.height()))
+        return True
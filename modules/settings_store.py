@@ -0,0 +1,172 @@
+"""设置存储模块
+
+所有设置保存在一个带版本号的 JSON 文件中：
+- 第一次读取时才加载文件，之后都从内存读取
+- 修改只更新内存，由后台线程延迟写盘，一段时间内的多次修改合并为一次写入
+- 写入先写临时文件再 os.replace，中途退出不会留下写了一半的文件
+- 新文件不存在时从旧的 background_config.json / calculator_settings.json 迁移
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _migrate_background_config(data):
+    """background_config.json：{"background": 路径, "opacity": 0~1}"""
+    return {key: data[key] for key in ('background', 'opacity') if key in data}
+
+
+def _migrate_calculator_settings(data):
+    """calculator_settings.json：{"background_path": 路径, "alpha": 0~100}"""
+    settings = {}
+    if 'background_path' in data:
+        settings['background'] = data['background_path']
+    if 'alpha' in data:
+        settings['opacity'] = min(max(data['alpha'] / 100, 0), 1)
+    return settings
+
+
+class SettingsStore:
+    """带版本号、延迟合并写入的设置存储"""
+    VERSION = 1
+    DEFAULTS = {
+        'background': None,
+        'opacity': 0.8,
+    }
+    # 旧的设置文件及其迁移函数，按顺序应用，后面的覆盖前面的
+    LEGACY_FILES = (
+        ('calculator_settings.json', _migrate_calculator_settings),
+        ('background_config.json', _migrate_background_config),
+    )
+    # 旧版本 -> 升级到下一版本的函数
+    MIGRATIONS = {}
+    # 修改后延迟写盘的时间（秒）
+    WRITE_DELAY = 0.5
+
+    def __init__(self, path="settings.json", legacy_files=LEGACY_FILES, delay=WRITE_DELAY):
+        self.path = path
+        self.legacy_files = legacy_files
+        self.delay = delay
+        self.data = None  # 第一次访问时加载
+        self.dirty = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.writer = None
+        atexit.register(self.close)
+
+    def _read_json(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _load(self):
+        """加载设置文件，必要时升级版本或从旧文件迁移（调用方持有锁）"""
+        data = {}
+        try:
+            if os.path.exists(self.path):
+                data = self._read_json(self.path)
+                version = data.pop('version', 0)
+                while version < self.VERSION and version in self.MIGRATIONS:
+                    data = self.MIGRATIONS[version](data)
+                    version += 1
+                self.dirty = version != self.VERSION
+            else:
+                for legacy_path, migrate in self.legacy_files:
+                    if os.path.exists(legacy_path):
+                        data.update(migrate(self._read_json(legacy_path)))
+                        self.dirty = True
+        except Exception as e:
+            logger.error(f"加载设置文件时出错: {str(e)}")
+        self.data = data
+        if self.dirty:
+            self._start_writer()
+
+    def _ensure_loaded(self):
+        if self.data is None:
+            self._load()
+
+    def get(self, key, default=None):
+        """读取设置，未设置时返回默认值"""
+        with self.condition:
+            self._ensure_loaded()
+            if key in self.data:
+                return self.data[key]
+            return self.DEFAULTS.get(key, default)
+
+    def set(self, key, value):
+        """修改设置，稍后在后台写盘"""
+        self.update({key: value})
+
+    def update(self, values):
+        """批量修改设置，值没有变化时不写盘"""
+        with self.condition:
+            self._ensure_loaded()
+            changed = False
+            for key, value in values.items():
+                if key not in self.data or self.data[key] != value:
+                    self.data[key] = value
+                    changed = True
+            if changed:
+                self.dirty = True
+                self._start_writer()
+                self.condition.notify()
+
+    def _start_writer(self):
+        """启动后台写盘线程（调用方持有锁）"""
+        if self.writer is None and not self.closed:
+            self.writer = threading.Thread(target=self._run, name="settings-writer", daemon=True)
+            self.writer.start()
+
+    def _run(self):
+        """后台线程：有修改时等待 delay 秒合并后续修改，再写盘"""
+        while True:
+            with self.condition:
+                while not self.dirty and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                deadline = time.monotonic() + self.delay
+                while not self.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+            self.flush()
+
+    def flush(self):
+        """立即写入尚未保存的修改"""
+        with self.write_lock:
+            with self.condition:
+                if not self.dirty:
+                    return
+                settings = dict(self.data, version=self.VERSION)
+                self.dirty = False
+            try:
+                self._write(settings)
+            except Exception as e:
+                logger.error(f"保存设置文件时出错: {str(e)}")
+
+    def _write(self, settings):
+        """原子地写入设置文件"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(settings, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def close(self):
+        """停止后台线程并写入剩余的修改"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.flush()
@@ -0,0 +1,109 @@
+"""单实例模块
+
+基于 QLocalServer / QLocalSocket：第一个实例监听本地套接字，之后启动的实例
+连接上去发送一条消息（显示窗口、可选地计算一个表达式）后立即退出，
+不再导入界面模块，也不创建窗口。
+
+消息是一行 UTF-8 编码的 JSON，例如 {"command": "activate", "expression": "1+2"}。
+"""
+import getpass
+import json
+import logging
+
+from PySide2.QtCore import QObject, Signal
+from PySide2.QtNetwork import QLocalServer, QLocalSocket
+
+logger = logging.getLogger(__name__)
+
+
+def server_name():
+    """按用户区分的本地套接字名称"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "default"
+    return f"calculator-{user}"
+
+
+class SingleInstance(QObject):
+    """单实例服务端，收到的消息通过 message_received 信号发出"""
+    message_received = Signal(dict)
+    # 连接和发送的超时时间（毫秒）
+    TIMEOUT = 500
+    # 监听失败时探测已有实例的超时时间（毫秒）
+    PROBE_TIMEOUT = 100
+
+    def __init__(self, name=None, parent=None):
+        super().__init__(parent)
+        self.name = name or server_name()
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._on_new_connection)
+        self.buffers = {}  # 连接 -> 尚未读完一行的数据
+
+    @classmethod
+    def send(cls, message, name=None, timeout=TIMEOUT):
+        """把消息发给正在运行的实例，没有实例时返回 False"""
+        socket = QLocalSocket()
+        socket.connectToServer(name or server_name())
+        if not socket.waitForConnected(timeout):
+            return False
+        socket.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+        sent = socket.waitForBytesWritten(timeout)
+        socket.disconnectFromServer()
+        return sent
+
+    def listen(self):
+        """开始监听；上次异常退出留下的套接字文件会先被清除
+
+        名称被占用时先尝试连接：能连上说明另一个实例正在运行，不能删除它的套接字。
+        """
+        if self.server.listen(self.name):
+            return True
+        if self.server.serverError() == QLocalServer.AddressInUseError:
+            socket = QLocalSocket()
+            socket.connectToServer(self.name)
+            if socket.waitForConnected(self.PROBE_TIMEOUT):
+                socket.disconnectFromServer()
+                logger.error(f"本地套接字 {self.name} 已被另一个实例使用")
+                return False
+            QLocalServer.removeServer(self.name)
+            if self.server.listen(self.name):
+                return True
+        logger.error(f"无法监听本地套接字 {self.name}: {self.server.errorString()}")
+        return False
+
+    def close(self):
+        """停止监听"""
+        self.server.close()
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b""
+            socket.readyRead.connect(lambda socket=socket: self._on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self._on_disconnected(socket))
+            # 连接建立前已到达的数据
+            if socket.bytesAvailable():
+                self._on_ready_read(socket)
+
+    def _on_ready_read(self, socket):
+        """按行解析收到的消息"""
+        data = self.buffers.get(socket, b"") + bytes(socket.readAll())
+        *lines, self.buffers[socket] = data.split(b'\n')
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line.decode('utf-8'))
+            except ValueError:
+                logger.error("收到无法解析的单实例消息")
+                continue
+            if isinstance(message, dict):
+                self.message_received.emit(message)
+
+    def _on_disconnected(self, socket):
+        """连接关闭时处理剩余数据并释放连接"""
+        if socket.bytesAvailable():
+            self._on_ready_read(socket)
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
@@ -0,0 +1,76 @@
+"""启动耗时分析模块
+
+``python main.py --profile-startup`` 时启用：
+- 记录每个顶层导入（包括它间接导入的模块）的耗时
+- 记录各初始化阶段（创建 QApplication、创建界面、第一帧绘制等）距启动的时间
+第一帧绘制完成后把结果输出到标准错误。
+"""
+import builtins
+import sys
+import time
+
+
+class StartupProfile:
+    """启动阶段和导入耗时记录器"""
+    # 低于该耗时（秒）的导入不单独列出
+    IMPORT_THRESHOLD = 0.001
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.phases = []  # [(阶段, 距启动的秒数)]
+        self.imports = {}  # 顶层导入的模块 -> 秒数
+        self.import_depth = 0
+        self.original_import = None
+
+    def install_import_timer(self):
+        """替换内置 __import__，统计之后每个顶层导入的耗时"""
+        if not self.enabled or self.original_import is not None:
+            return
+        self.original_import = original = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level == 0 and name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            self.import_depth += 1
+            started = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self.import_depth -= 1
+                if self.import_depth == 0:
+                    if level and globals:
+                        name = f"{globals.get('__package__')}.{name}" if name else globals.get('__package__')
+                    self.imports[name] = self.imports.get(name, 0) + time.perf_counter() - started
+
+        builtins.__import__ = timed_import
+
+    def uninstall_import_timer(self):
+        """恢复内置 __import__"""
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def mark(self, phase):
+        """记录一个阶段完成的时间"""
+        if self.enabled:
+            self.phases.append((phase, time.perf_counter() - self.start))
+
+    def report(self, file=None):
+        """输出导入耗时和各阶段耗时"""
+        if not self.enabled:
+            return
+        self.uninstall_import_timer()
+        file = file or sys.stderr
+        print("启动耗时分析", file=file)
+        print("导入:", file=file)
+        imports = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)
+        for name, seconds in imports:
+            if seconds >= self.IMPORT_THRESHOLD:
+                print(f"  {seconds * 1000:8.1f} ms  {name}", file=file)
+        print(f"  {sum(self.imports.values()) * 1000:8.1f} ms  合计", file=file)
+        print("阶段（距启动）:", file=file)
+        previous = 0
+        for phase, elapsed in self.phases:
+            print(f"  {elapsed * 1000:8.1f} ms  (+{(elapsed - previous) * 1000:7.1f} ms)  {phase}", file=file)
+            previous = elapsed
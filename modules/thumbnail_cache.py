@@ -0,0 +1,105 @@
+"""背景缩略图磁盘缓存模块
+
+按（原图路径、修改时间、文件大小、目标尺寸）缓存缩放好的背景，
+启动时命中缓存即可完全跳过原图解码。
+
+每个条目是一个文件：固定长度的文件头后接未压缩的像素数据，
+读取时一次 read，再用 Image.frombuffer 包装（RGBA 不复制）。
+写入先写临时文件再 os.replace，其他进程不会读到写了一半的条目。
+"""
+import hashlib
+import os
+import struct
+import tempfile
+
+from PIL import Image
+
+
+class ThumbnailCache:
+    """缩放后背景的磁盘缓存（方法可在工作线程中调用）"""
+    MAGIC = b'CTHM'
+    VERSION = 1
+    # 魔数、版本、图像模式、宽、高、原图宽、原图高
+    HEADER = struct.Struct('<4sB4sIIII')
+    SUFFIX = '.thumb'
+    MODES = ('RGB', 'RGBA')
+    # 最多保留的条目数，超出后删除最久未使用的条目
+    MAX_ENTRIES = 16
+
+    def __init__(self, directory="background_cache", max_entries=MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def key(self, path, size):
+        """根据原图文件信息和目标尺寸计算缓存键"""
+        stat = os.stat(path)
+        text = f"{os.path.abspath(path)}\0{stat.st_mtime_ns}\0{stat.st_size}\0{size[0]}x{size[1]}"
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def entry_path(self, key):
+        """缓存条目的文件路径"""
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, path, size):
+        """读取缓存，返回 (图像, 原图尺寸)；未命中或条目损坏时返回 None"""
+        try:
+            entry = self.entry_path(self.key(path, size))
+            with open(entry, 'rb') as f:
+                data = f.read()
+            magic, version, mode, width, height, source_width, source_height = \
+                self.HEADER.unpack_from(data)
+            mode = mode.rstrip(b'\0').decode('ascii')
+            if magic != self.MAGIC or version != self.VERSION or mode not in self.MODES:
+                return None
+            pixels = memoryview(data)[self.HEADER.size:]
+            if len(pixels) != width * height * len(mode):
+                return None
+            image = Image.frombuffer(mode, (width, height), pixels, 'raw', mode, 0, 1)
+            # 更新访问时间，供清理时判断最久未使用的条目
+            os.utime(entry)
+            return image, (source_width, source_height)
+        except (OSError, struct.error, ValueError):
+            return None
+
+    def put(self, path, size, image, source_size):
+        """写入缓存（失败时静默忽略）"""
+        if image.mode not in self.MODES:
+            image = image.convert('RGBA')
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            header = self.HEADER.pack(self.MAGIC, self.VERSION, image.mode.encode('ascii'),
+                                      image.width, image.height, *source_size)
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(header)
+                    f.write(image.tobytes())
+                os.replace(temp_path, self.entry_path(self.key(path, size)))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self.prune()
+        except OSError:
+            pass
+
+    def prune(self, max_entries=None):
+        """删除超出数量限制的最久未使用的条目"""
+        if max_entries is None:
+            max_entries = self.max_entries
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.name.endswith(self.SUFFIX)]
+        except OSError:
+            return
+        if len(entries) <= max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[:len(entries) - max_entries]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """删除所有缓存条目"""
+        self.prune(0)
@@ -0,0 +1,107 @@
+"""撤销/重做模块
+
+每一步保存一个紧凑的字节串状态（CalculatorCore.snapshot() 加上显示内容，
+通常不到 100 字节），而不是复制整个对象；与上一步相同的状态不重复保存。
+撤销和重做只在两个 deque 之间移动一个元素，都是 O(1)。
+两个栈的总字节数超过预算时，先丢弃离当前最远的重做步骤，再丢弃最早的撤销步骤，
+默认预算可以保存数万步。
+"""
+import struct
+import sys
+from collections import deque
+
+# 状态头：核心快照、表达式、结果三段的字节数
+_STATE = struct.Struct('<3I')
+
+
+def pack_state(core, expression, result):
+    """把核心状态和显示内容打包为一个字节串"""
+    snapshot = core.snapshot()
+    expression = expression.encode('utf-8')
+    result = result.encode('utf-8')
+    return b''.join((_STATE.pack(len(snapshot), len(expression), len(result)),
+                     snapshot, expression, result))
+
+
+def unpack_state(data):
+    """pack_state 的逆操作，返回 (核心快照, 表达式, 结果)"""
+    view = memoryview(data)
+    lengths = _STATE.unpack_from(view)
+    parts = []
+    offset = _STATE.size
+    for length in lengths:
+        parts.append(view[offset:offset + length])
+        offset += length
+    snapshot, expression, result = parts
+    return snapshot, str(expression, 'utf-8'), str(result, 'utf-8')
+
+
+class UndoHistory:
+    """有字节预算的撤销/重做栈，保存的状态是不可变的字节串"""
+    # deque 中每个元素的指针开销
+    SLOT_BYTES = 8
+
+    def __init__(self, budget=4 * 1024 * 1024):
+        self.budget = budget
+        self.undo_states = deque()
+        self.redo_states = deque()
+        self.nbytes = 0
+
+    def _cost(self, state):
+        return sys.getsizeof(state) + self.SLOT_BYTES
+
+    def record(self, state):
+        """在修改状态前调用，保存修改前的状态；之后的重做步骤失效"""
+        if self.redo_states:
+            self.nbytes -= sum(self._cost(s) for s in self.redo_states)
+            self.redo_states.clear()
+        if self.undo_states and self.undo_states[-1] == state:
+            return
+        self.undo_states.append(state)
+        self.nbytes += self._cost(state)
+        self.trim()
+
+    def trim(self):
+        """丢弃步骤直到两个栈合计不超过预算（至少保留最近一步撤销）
+
+        先从重做栈底部（离当前最远的一步）丢弃，再丢弃最早的撤销步骤。
+        """
+        while self.nbytes > self.budget and self.redo_states:
+            self.nbytes -= self._cost(self.redo_states.popleft())
+        while self.nbytes > self.budget and len(self.undo_states) > 1:
+            self.nbytes -= self._cost(self.undo_states.popleft())
+
+    def undo(self, current):
+        """返回上一步的状态，current 进入重做栈；没有可撤销的步骤时返回 None"""
+        return self._move(self.undo_states, self.redo_states, current)
+
+    def redo(self, current):
+        """返回下一步的状态，current 进入撤销栈；没有可重做的步骤时返回 None"""
+        return self._move(self.redo_states, self.undo_states, current)
+
+    def _move(self, source, target, current):
+        # 跳过与当前状态相同的步骤（例如没有产生变化的按键）
+        while source and source[-1] == current:
+            self.nbytes -= self._cost(source.pop())
+        if not source:
+            return None
+        state = source.pop()
+        self.nbytes -= self._cost(state)
+        target.append(current)
+        self.nbytes += self._cost(current)
+        self.trim()
+        return state
+
+    def can_undo(self):
+        return bool(self.undo_states)
+
+    def can_redo(self):
+        return bool(self.redo_states)
+
+    def clear(self):
+        self.undo_states.clear()
+        self.redo_states.clear()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self.undo_states) + len(self.redo_states)
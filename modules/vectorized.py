@@ -0,0 +1,173 @@
+"""向量化计算模块
+
+用 NumPy 对一列输入整体计算同一个含变量的算式，例如 ``x² ÷ 3 + 1/x``。
+逐元素的错误掩码与 CalculatorCore 的语义一致：
+除数为零（calculate 的“除数不能为零”、special_operation 的 1/0）
+以及负数开方（special_operation 的“无效输入”）。
+
+需要安装 numpy。
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from .expression_engine import (Binary, Call, ExpressionError, Number, Percent,
+                                Unary, Variable, compile_expression, normalize)
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是可选依赖
+    np = None
+
+
+class VectorResult(namedtuple('VectorResult', 'values divide_by_zero invalid_input')):
+    """向量计算结果
+
+    values 为 float64 数组，出错的元素为 NaN；
+    divide_by_zero / invalid_input 为布尔掩码，每个元素只记录第一个发生的错误。
+    """
+    __slots__ = ()
+
+    @property
+    def errors(self):
+        """任意错误的掩码"""
+        return self.divide_by_zero | self.invalid_input
+
+    def to_strings(self, format_number):
+        """按界面格式逐个转换为字符串（逐元素循环，仅用于输出）"""
+        messages = []
+        for value, zero, invalid in zip(self.values.tolist(), self.divide_by_zero.tolist(),
+                                        self.invalid_input.tolist()):
+            if zero:
+                messages.append("除数不能为零")
+            elif invalid:
+                messages.append("无效输入")
+            else:
+                messages.append(format_number(value))
+        return messages
+
+
+class _Masks:
+    """计算过程中累积的错误掩码"""
+    __slots__ = ('divide_by_zero', 'invalid_input')
+
+    def __init__(self, shape):
+        self.divide_by_zero = np.zeros(shape, dtype=bool)
+        self.invalid_input = np.zeros(shape, dtype=bool)
+
+    def mark_divide_by_zero(self, condition):
+        self.divide_by_zero |= condition & ~self.invalid_input
+
+    def mark_invalid_input(self, condition):
+        self.invalid_input |= condition & ~self.divide_by_zero
+
+
+_COMBINE = {
+    '+': np.add,
+    '-': np.subtract,
+    '×': np.multiply,
+    '÷': np.divide,
+} if np is not None else {}
+
+
+def _compile_node(node):
+    """将语法树节点编译为 program(values, masks) 闭包"""
+    kind = type(node)
+    if kind is Number:
+        value = node.value
+        return lambda values, masks: value
+    if kind is Variable:
+        return lambda values, masks: values
+    if kind is Unary:
+        operand = _compile_node(node.operand)
+        if node.op == '-':
+            return lambda values, masks: np.negative(operand(values, masks))
+        return operand
+    if kind is Percent:
+        operand = _compile_node(node.operand)
+        return lambda values, masks: np.divide(operand(values, masks), 100)
+    if kind is Call:
+        argument = _compile_node(node.argument)
+        if node.name == 'pow':
+            def square(values, masks):
+                value = argument(values, masks)
+                return np.multiply(value, value)
+            return square
+
+        def sqrt(values, masks):
+            value = argument(values, masks)
+            masks.mark_invalid_input(np.less(value, 0))
+            return np.sqrt(value)
+        return sqrt
+
+    # 与 expression_engine 相同：沿左侧展开左结合的运算链，逐项累积计算，
+    # 很长的算式也不会超出递归深度
+    chain = []
+    while type(node) is Binary:
+        chain.append(node)
+        node = node.left
+    first = _compile_node(node)
+    steps = []
+    for binary in reversed(chain):
+        # 加减法中，百分比相对于第一个数计算
+        percent = binary.op in ('+', '-') and type(binary.right) is Percent
+        right = binary.right.operand if percent else binary.right
+        steps.append((binary.op, _COMBINE[binary.op], _compile_node(right), percent))
+
+    def apply_chain(values, masks):
+        value = first(values, masks)
+        for op, combine, right, percent in steps:
+            operand = right(values, masks)
+            if percent:
+                value = combine(value, np.multiply(value, np.divide(operand, 100)))
+            else:
+                if op == '÷':
+                    masks.mark_divide_by_zero(np.equal(operand, 0))
+                value = combine(value, operand)
+        return value
+    return apply_chain
+
+
+@lru_cache(maxsize=256)
+def _compile_program(text, variable):
+    compiled = compile_expression(text)
+    unknown = compiled.variables - {variable}
+    if unknown:
+        raise ExpressionError(f"未知变量: {', '.join(sorted(unknown))}")
+    return _compile_node(compiled.tree)
+
+
+def as_array(values):
+    """将 NumPy 数组、array.array 或其他缓冲区视为一维数组（尽量不复制）
+
+    float64 输入直接共享内存；其他数值类型会转换一次为 float64。
+    """
+    if np is None:
+        raise ImportError("向量化计算需要安装 numpy")
+    if not isinstance(values, np.ndarray):
+        try:
+            values = np.asarray(memoryview(values))
+        except TypeError:
+            values = np.asarray(values)
+    if values.dtype != np.float64:
+        values = values.astype(np.float64)
+    return values
+
+
+def evaluate_array(expression, values, variable='x'):
+    """对一列输入计算含变量的算式，返回 VectorResult
+
+    expression 中的变量名由 variable 指定（默认 x），输入数组不会被修改。
+    """
+    program = _compile_program(normalize(expression), variable)
+    values = as_array(values)
+    masks = _Masks(values.shape)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        result = np.asarray(program(values, masks), dtype=np.float64)
+    result = np.array(np.broadcast_to(result, values.shape)) if result.shape != values.shape else result
+    if result is values:
+        # 算式就是变量本身，结果不能与输入共享内存
+        result = values.copy()
+    errors = masks.divide_by_zero | masks.invalid_input
+    if errors.any():
+        result[errors] = np.nan
+    return VectorResult(result, masks.divide_by_zero, masks.invalid_input)